@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import threading
 import time
+from collections import deque
 from typing import Any
 
 import cv2
@@ -8,6 +10,12 @@ import numpy as np
 import torch
 from torchvision.models.video import R2Plus1D_18_Weights, r2plus1d_18
 
+from metrics import stage
+from utils import box_iou
+
+# (timestamp, downscaled RGB frame, person boxes in buffer pixels, buffer/source scale, frame trace)
+_Entry = tuple[float, np.ndarray, list[list[float]], float, dict[str, Any] | None]
+
 
 class ActionService:
     def __init__(
@@ -17,55 +25,165 @@ class ActionService:
         window_s: float,
         frames: int,
         use_gpu: bool,
+        max_people: int = 4,
+        inference=None,
     ) -> None:
         self.detector = detector
+        self.inference = inference
         self.interval_s = max(5, int(interval_s))
         self.window_s = max(0.5, float(window_s))
         self.frames = max(8, int(frames))
+        self.max_people = max(1, int(max_people))
         self.device = torch.device("cuda" if use_gpu and torch.cuda.is_available() else "cpu")
 
         self._weights = R2Plus1D_18_Weights.DEFAULT
-        self._model = r2plus1d_18(weights=self._weights).to(self.device)
-        self._model.eval()
+        self._model = None
         self._preprocess = self._weights.transforms()
         self._categories = self._weights.meta["categories"]
+        self._clip_size = (171, 128)
+        # Frames are kept larger than the clip size so person crops keep some detail.
+        self._buffer_width = 320
 
-        self._stop = False
+        # Sample at twice the clip rate so every target timestamp has a nearby frame.
+        self._sample_interval = self.window_s / (self.frames * 2)
+        self._buffer: deque[_Entry] = deque(maxlen=self.frames * 4)
+        self._buffer_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._frames = None
+        self._presence = None
         self._last_result: dict[str, Any] | None = None
 
+    def load(self) -> None:
+        if self._model is not None:
+            return
+        model = r2plus1d_18(weights=self._weights).to(self.device)
+        model.eval()
+        self._model = model
+
+    def is_ready(self) -> bool:
+        return self._model is not None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        # Woken by new frames, at most once per sample interval; only the newest pending frame event is kept.
+        self._frames = self.detector.bus.subscribe(("frame",), min_interval_s=self._sample_interval, maxlen=1)
+        self._presence = self.detector.bus.subscribe(("person_appeared", "person_left"))
+        self._thread = threading.Thread(target=self._fill_loop, daemon=True)
+        self._thread.start()
+
     def stop(self) -> None:
-        self._stop = True
+        self._stop.set()
+        if self._frames is not None:
+            self._frames.close()
+        if self._presence is not None:
+            self._presence.close()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
 
     def get_last(self) -> dict[str, Any] | None:
         return dict(self._last_result) if self._last_result else None
 
-    def _capture_clip(self) -> np.ndarray | None:
-        interval = self.window_s / self.frames
-        frames = []
-        for _ in range(self.frames):
-            frame = self.detector.get_latest_frame(annotated=False)
-            if frame is None:
-                time.sleep(0.02)
+    def _fill_loop(self) -> None:
+        last_seq = -1
+        while not self._stop.is_set():
+            if not self.detector.person_present():
+                # Nobody in view: sleep until someone appears instead of resizing frames nobody will classify.
+                # Action tracking waits a full window after an arrival, so no pre-roll is lost.
+                self._presence.get()
+                continue
+            if not self._frames.get(timeout=1.0):
                 continue
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frames.append(rgb)
-            time.sleep(interval)
-        if len(frames) < max(4, self.frames // 2):
+            seq, frame, detections, trace = self.detector.get_latest_raw()
+            if frame is not None and seq != last_seq:
+                last_seq = seq
+                scale = self._buffer_width / float(frame.shape[1])
+                size = (self._buffer_width, max(1, int(round(frame.shape[0] * scale))))
+                small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+                people = [
+                    [x * scale, y * scale, (x + w) * scale, (y + h) * scale]
+                    for x, y, w, h in (det["bbox"] for det in detections if det.get("label") == "person")
+                ]
+                with self._buffer_lock:
+                    self._buffer.append((time.time(), rgb, people, scale, trace))
+
+    def _capture_clip(self) -> list[_Entry] | None:
+        end = time.time()
+        start = end - self.window_s
+        with self._buffer_lock:
+            window = [entry for entry in self._buffer if entry[0] >= start]
+        if len(window) < max(4, self.frames // 2):
             return None
-        return np.stack(frames, axis=0)
+        stamps = np.array([entry[0] for entry in window])
+        targets = np.linspace(start, end, self.frames)
+        # Nearest buffered frame for each evenly spaced target time.
+        indices = np.abs(stamps[None, :] - targets[:, None]).argmin(axis=1)
+        return [window[i] for i in indices]
+
+    def _build_tubes(self, clip: list[_Entry]) -> list[list[float]]:
+        anchors = sorted(clip[-1][2], key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+        tubes = []
+        for anchor in anchors[: self.max_people]:
+            box = anchor
+            tube = list(anchor)
+            # Follow the person backwards through the clip by best IoU and grow the tube to cover them.
+            for _, _, people, _, _ in reversed(clip[:-1]):
+                if not people:
+                    continue
+                match = max(people, key=lambda b: box_iou(box, b))
+                if box_iou(box, match) < 0.3:
+                    continue
+                box = match
+                tube = [min(tube[0], box[0]), min(tube[1], box[1]), max(tube[2], box[2]), max(tube[3], box[3])]
+            tubes.append(tube)
+        return tubes
+
+    def _crop_tube(self, frames: np.ndarray, tube: list[float] | None) -> torch.Tensor:
+        if tube is not None:
+            height, width = frames.shape[1:3]
+            pad_x = (tube[2] - tube[0]) * 0.1
+            pad_y = (tube[3] - tube[1]) * 0.1
+            x1 = max(0, int(tube[0] - pad_x))
+            y1 = max(0, int(tube[1] - pad_y))
+            x2 = min(width, int(tube[2] + pad_x))
+            y2 = min(height, int(tube[3] + pad_y))
+            if x2 - x1 >= 8 and y2 - y1 >= 8:
+                frames = frames[:, y1:y2, x1:x2]
+        resized = np.stack([cv2.resize(frame, self._clip_size, interpolation=cv2.INTER_LINEAR) for frame in frames])
+        video = torch.from_numpy(resized).permute(0, 3, 1, 2)  # T, C, H, W
+        return self._preprocess(video)
+
+    def _forward(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            return torch.softmax(self._model(batch), dim=1)
 
     def run_once(self) -> dict[str, Any] | None:
+        if self._model is None:
+            return None
         clip = self._capture_clip()
         if clip is None:
             return None
-        video = torch.from_numpy(clip).permute(0, 3, 1, 2)  # T, C, H, W
-        video = self._preprocess(video).unsqueeze(0).to(self.device)
-        with torch.no_grad():
-            logits = self._model(video).squeeze(0)
-            probs = torch.softmax(logits, dim=0)
-        topk = torch.topk(probs, k=3)
-        results = []
-        for score, idx in zip(topk.values.cpu().tolist(), topk.indices.cpu().tolist()):
-            results.append({"label": self._categories[idx], "score": float(score)})
-        best = results[0] if results else None
-        return {"best": best, "topk": results}
+        frames = np.stack([entry[1] for entry in clip], axis=0)
+        # Tubes live in buffer coordinates; report them in source frame pixels.
+        scale = 1.0 / clip[-1][3]
+        tubes: list[list[float] | None] = self._build_tubes(clip) or [None]
+
+        # Every person's clip goes through the model in a single batched forward pass.
+        batch = torch.stack([self._crop_tube(frames, tube) for tube in tubes]).to(self.device)
+        with stage("action_infer"):
+            if self.inference is None:
+                probs = self._forward(batch)
+            else:
+                probs = self.inference.run("action", self._forward, batch)
+        topk = torch.topk(probs, k=3, dim=1)
+
+        people = []
+        for tube, scores, indices in zip(tubes, topk.values.cpu().tolist(), topk.indices.cpu().tolist()):
+            results = [{"label": self._categories[idx], "score": float(score)} for score, idx in zip(scores, indices)]
+            bbox = [round(v * scale, 1) for v in tube] if tube is not None else None
+            people.append({"bbox": bbox, "best": results[0] if results else None, "topk": results})
+        primary = max(people, key=lambda item: item["best"]["score"] if item["best"] else 0.0)
+        # Results are attributed to the newest frame in the clip.
+        return {"best": primary["best"], "topk": primary["topk"], "people": people, "trace": clip[-1][4]}
@@ -1,46 +1,110 @@
 from __future__ import annotations
 
 import io
+import logging
 import threading
 import time
 import wave
 from typing import Any
 
 import numpy as np
-import requests
 import sounddevice as sd
 
+from metrics import stage
+
+logger = logging.getLogger("vision-v1")
+
+# A local model that failed to load is retried after this long, doubling up to the cap, not on every hop.
+_LOCAL_RETRY_S = 60.0
+_LOCAL_RETRY_MAX_S = 3600.0
+
+
+class _AudioRing:
+    def __init__(self, size: int) -> None:
+        self._data = np.zeros(max(1, size), dtype=np.float32)
+        self._pos = 0
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        samples = samples[-self._data.size :]
+        n = samples.size
+        with self._lock:
+            end = self._pos + n
+            if end <= self._data.size:
+                self._data[self._pos : end] = samples
+            else:
+                split = self._data.size - self._pos
+                self._data[self._pos :] = samples[:split]
+                self._data[: n - split] = samples[split:]
+            self._pos = end % self._data.size
+            self.total += n
+
+    def latest(self, n: int, offset: int = 0) -> np.ndarray | None:
+        with self._lock:
+            if n + offset > self._data.size or self.total < n + offset:
+                return None
+            end = self._pos - offset
+            return self._data[np.arange(end - n, end) % self._data.size]
+
 
 class AudioAlertService:
     def __init__(
         self,
         face_db,
+        http_client,
         hf_url: str | None,
         hf_token: str | None,
         labels: list[str],
         threshold: float,
-        interval_s: int,
+        hop_s: float,
         window_s: float,
         sample_rate: int,
         device: str | int | None,
         local_model: str | None,
+        inference=None,
+        gate_db: float = -35.0,
+        max_batch: int = 4,
     ) -> None:
         self.face_db = face_db
+        self.http_client = http_client
         self.hf_url = hf_url
         self.hf_token = hf_token
         self.labels = [label.lower() for label in labels]
         self.threshold = float(threshold)
-        self.interval_s = max(2, int(interval_s))
         self.window_s = max(0.5, float(window_s))
+        # A hop longer than the window would leave unheard gaps, so it is capped at the window; shorter hops overlap.
+        self.hop_s = min(max(0.1, float(hop_s)), self.window_s)
+        if self.hop_s < float(hop_s):
+            logger.warning("AUDIO_HOP_S=%s is longer than the %.1fs window, using %.1fs", hop_s, self.window_s, self.hop_s)
         self.sample_rate = int(sample_rate)
         self.device = device
         self.local_model = local_model
+        self.inference = inference
+        self.gate_db = float(gate_db)
+        self.max_batch = max(1, int(max_batch))
 
         self._stop = threading.Event()
         self._thread: threading.Thread | None = None
         self._lock = threading.Lock()
         self._last_result: dict[str, Any] | None = None
         self._local_pipeline = None
+        self._local_rate: int | None = None
+        self._local_lock = threading.Lock()
+        self._local_error: str | None = None
+        self._local_failures = 0
+        self._local_retry_at = 0.0
+
+        self._window_samples = int(self.sample_rate * self.window_s)
+        self._hop_samples = int(self.sample_rate * self.hop_s)
+        # Room for max_batch overlapping windows so hops missed during a slow call can be batched.
+        self._ring = _AudioRing(self._window_samples + (self.max_batch + 1) * self._hop_samples)
+        self._hop_ready = threading.Event()
+        self._last_hop = 0
+        self._windows = 0
+        self._dropped_hops = 0
+        self._gated = 0
+        self._last_level_db: float | None = None
 
     def start(self) -> None:
         if self._thread is not None:
@@ -61,20 +125,28 @@ class AudioAlertService:
         with self._lock:
             self._last_result = payload
 
-    def _record_wav(self) -> bytes | None:
-        frames = int(self.sample_rate * self.window_s)
-        try:
-            audio = sd.rec(
-                frames,
-                samplerate=self.sample_rate,
-                channels=1,
-                dtype="float32",
-                device=self.device,
-            )
-            sd.wait()
-        except Exception:
-            return None
-        pcm = np.clip(audio.squeeze() * 32767.0, -32768, 32767).astype(np.int16)
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            windows = self._windows
+            return {
+                "windows": windows,
+                "gated": self._gated,
+                "gated_rate": round(self._gated / windows, 4) if windows else 0.0,
+                "gate_db": self.gate_db,
+                "last_level_db": self._last_level_db,
+                "dropped_hops": self._dropped_hops,
+                "window_s": self.window_s,
+                "hop_s": self.hop_s,
+                "local_error": self._local_error,
+            }
+
+    def _on_audio(self, indata, frames, time_info, status) -> None:
+        self._ring.write(indata[:, 0])
+        if self._ring.total - self._last_hop >= self._hop_samples:
+            self._hop_ready.set()
+
+    def _encode_wav(self, audio: np.ndarray) -> bytes:
+        pcm = np.clip(audio * 32767.0, -32768, 32767).astype(np.int16)
         buf = io.BytesIO()
         with wave.open(buf, "wb") as wf:
             wf.setnchannels(1)
@@ -91,7 +163,8 @@ class AudioAlertService:
             "Content-Type": "audio/wav",
         }
         try:
-            resp = requests.post(self.hf_url, headers=headers, data=wav_bytes, timeout=30)
+            with stage("audio_remote"):
+                resp = self.http_client.post(self.hf_url, data=wav_bytes, headers=headers)
             data = resp.json()
         except Exception:
             return None
@@ -101,19 +174,56 @@ class AudioAlertService:
             return data
         return None
 
-    def _call_local(self, wav_bytes: bytes) -> list[dict[str, Any]] | None:
+    def load_local(self) -> bool:
         if not self.local_model:
-            return None
-        if self._local_pipeline is None:
+            return False
+        with self._local_lock:
+            if self._local_pipeline is not None:
+                return True
+            if time.monotonic() < self._local_retry_at:
+                return False
             try:
                 from transformers import pipeline
-            except Exception:
-                return None
-            self._local_pipeline = pipeline("audio-classification", model=self.local_model)
+
+                local_pipeline = pipeline("audio-classification", model=self.local_model)
+                rate = int(local_pipeline.feature_extractor.sampling_rate)
+                # Warm-up pass so the first real window does not pay for lazy initialisation.
+                local_pipeline(np.zeros(rate, dtype=np.float32), top_k=1)
+            except Exception as exc:
+                self._local_failures += 1
+                delay = min(_LOCAL_RETRY_MAX_S, _LOCAL_RETRY_S * 2 ** (self._local_failures - 1))
+                self._local_retry_at = time.monotonic() + delay
+                with self._lock:
+                    self._local_error = str(exc)
+                logger.error("Audio model %s failed to load, retrying in %.0fs: %s", self.local_model, delay, exc)
+                return False
+            self._local_pipeline = local_pipeline
+            self._local_rate = rate
+            self._local_failures = 0
+            with self._lock:
+                self._local_error = None
+        return True
+
+    def _resample(self, audio: np.ndarray) -> np.ndarray:
+        if self._local_rate is None or self._local_rate == self.sample_rate:
+            return audio
+        target = int(round(audio.size * self._local_rate / self.sample_rate))
+        positions = np.linspace(0, audio.size - 1, target)
+        return np.interp(positions, np.arange(audio.size), audio).astype(np.float32)
+
+    def _call_local(self, windows: list[np.ndarray]) -> list[list[dict[str, Any]] | None]:
+        if not windows or not self.load_local():
+            return [None] * len(windows)
+        arrays = [self._resample(audio) for audio in windows]
         try:
-            return self._local_pipeline(wav_bytes, top_k=5)
+            with stage("audio_local"):
+                if self.inference is None:
+                    results = self._local_pipeline(arrays, top_k=5, batch_size=len(arrays))
+                else:
+                    results = self.inference.run("audio", self._local_pipeline, arrays, top_k=5, batch_size=len(arrays))
         except Exception:
-            return None
+            return [None] * len(windows)
+        return list(results)
 
     def _pick_alert(self, results: list[dict[str, Any]]) -> dict[str, Any] | None:
         best = None
@@ -125,17 +235,40 @@ class AudioAlertService:
                     best = {"label": label, "score": score}
         return best
 
-    def _loop(self) -> None:
-        while not self._stop.is_set():
-            time.sleep(self.interval_s)
-            wav_bytes = self._record_wav()
-            if not wav_bytes:
-                continue
-            results = self._call_hf(wav_bytes) or self._call_local(wav_bytes)
-            if not results:
+    def _level_db(self, audio: np.ndarray) -> float:
+        # Loudest 25 ms frame in dBFS; a scream or shout is never quieter than the gate.
+        frame = max(1, self.sample_rate // 40)
+        usable = audio[: audio.size - audio.size % frame]
+        if usable.size == 0:
+            return -120.0
+        rms = np.sqrt(np.mean(np.square(usable.reshape(-1, frame)), axis=1))
+        return float(20.0 * np.log10(max(float(rms.max()), 1e-6)))
+
+    def _classify(self, windows: list[np.ndarray]) -> None:
+        loud = []
+        with self._lock:
+            for audio in windows:
+                level = self._level_db(audio)
+                self._last_level_db = round(level, 1)
+                if level < self.gate_db:
+                    self._gated += 1
+                    continue
+                loud.append(audio)
+        if not loud:
+            return
+
+        results: list[list[dict[str, Any]] | None] = [self._call_hf(self._encode_wav(audio)) for audio in loud]
+        missing = [i for i, item in enumerate(results) if not item]
+        if missing:
+            # The local model takes raw float32 arrays; every window the remote call did not answer goes in one batch.
+            for i, item in zip(missing, self._call_local([loud[i] for i in missing])):
+                results[i] = item
+
+        for item in results:
+            if not item:
                 self._set_last({"ok": False, "error": "no_results"})
                 continue
-            alert = self._pick_alert(results)
+            alert = self._pick_alert(item)
             if alert:
                 self.face_db.add_event(
                     event_type="audio_alert",
@@ -145,4 +278,42 @@ class AudioAlertService:
                     score=alert["score"],
                     bbox=None,
                 )
-            self._set_last({"ok": True, "alert": alert, "results": results})
+            self._set_last({"ok": True, "alert": alert, "results": item})
+
+    def _loop(self) -> None:
+        self.load_local()
+        while not self._stop.is_set():
+            try:
+                stream = sd.InputStream(
+                    samplerate=self.sample_rate,
+                    channels=1,
+                    dtype="float32",
+                    device=self.device,
+                    blocksize=max(1, self.sample_rate // 20),
+                    callback=self._on_audio,
+                )
+            except Exception:
+                self._set_last({"ok": False, "error": "input_unavailable"})
+                self._stop.wait(5)
+                continue
+            with stream:
+                # The stream records continuously; each hop classifies the newest window.
+                while not self._stop.is_set():
+                    if not self._hop_ready.wait(timeout=1.0):
+                        continue
+                    self._hop_ready.clear()
+                    total = self._ring.total
+                    hops = max(1, (total - self._last_hop) // max(1, self._hop_samples))
+                    self._last_hop = total
+                    # Hops that arrived while the previous call ran are classified together, oldest first.
+                    windows = []
+                    for i in reversed(range(min(hops, self.max_batch))):
+                        audio = self._ring.latest(self._window_samples, offset=i * self._hop_samples)
+                        if audio is not None:
+                            windows.append(audio)
+                    if not windows:
+                        continue
+                    with self._lock:
+                        self._windows += len(windows)
+                        self._dropped_hops += max(0, int(hops) - len(windows))
+                    self._classify(windows)
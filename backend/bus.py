@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Iterable
+
+
+class Subscription:
+    def __init__(self, topics: Iterable[str], min_interval_s: float = 0.0, maxlen: int = 32) -> None:
+        self.topics = frozenset(topics)
+        self.min_interval_s = max(0.0, float(min_interval_s))
+        self._events: deque[dict[str, Any]] = deque(maxlen=max(1, int(maxlen)))
+        self._cond = threading.Condition()
+        self._closed = False
+        self._delivered_at = float("-inf")
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _push(self, event: dict[str, Any]) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self.received += 1
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None) -> list[dict[str, Any]]:
+        # Blocks until events are pending and the subscriber's rate limit allows a delivery, then hands over
+        # everything that queued up meanwhile. Returns [] on timeout or once closed.
+        deadline = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                ready_at = self._delivered_at + self.min_interval_s
+                if self._events and now >= ready_at:
+                    events = list(self._events)
+                    self._events.clear()
+                    self._delivered_at = now
+                    return events
+                if deadline is not None and now >= deadline:
+                    return []
+                wake = deadline
+                if self._events:
+                    wake = ready_at if wake is None else min(wake, ready_at)
+                self._cond.wait(None if wake is None else wake - now)
+            return []
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._events.clear()
+            self._cond.notify_all()
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "topics": sorted(self.topics),
+                "min_interval_s": self.min_interval_s,
+                "pending": len(self._events),
+                "received": self.received,
+                "dropped": self.dropped,
+            }
+
+
+class EventBus:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: list[Subscription] = []
+        self._published: dict[str, int] = {}
+
+    def subscribe(self, topics: Iterable[str], min_interval_s: float = 0.0, maxlen: int = 32) -> Subscription:
+        subscription = Subscription(topics, min_interval_s, maxlen)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, topic: str, data: dict[str, Any] | None = None) -> None:
+        event = {"topic": topic, "ts": time.monotonic(), "data": data or {}}
+        with self._lock:
+            self._published[topic] = self._published.get(topic, 0) + 1
+            subscriptions = [sub for sub in self._subscriptions if topic in sub.topics]
+        for subscription in subscriptions:
+            subscription._push(event)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            published = dict(self._published)
+            subscriptions = list(self._subscriptions)
+        return {"published": published, "subscriptions": [sub.get_stats() for sub in subscriptions]}
@@ -29,7 +29,7 @@ class Settings:
     action_window_s: float
     action_frames: int
     action_conf_threshold: float
-    audio_interval: int
+    audio_hop_s: float
     audio_window_s: float
     audio_sample_rate: int
     audio_threshold: float
@@ -39,6 +39,74 @@ class Settings:
     audio_local_model: str | None
     emotion_conf_threshold: float
     security_unknown_seconds: int
+    clip_dir: str
+    clip_pre_s: float
+    clip_post_s: float
+    clip_fps: int
+    clip_segment_s: float
+    clip_max_buffer_mb: int
+    clip_jpeg_quality: int
+    clip_triggers: list[str]
+    upload_queue_path: str
+    upload_workers: int
+    upload_max_attempts: int
+    upload_backoff_max_s: float
+    capture_dedup_distance: int
+    capture_dedup_history: int
+    capture_thumbnail_width: int
+    emotion_local_model: str | None
+    emotion_local_labels: list[str]
+    emotion_input_size: int
+    http_pool_size: int
+    http_endpoint_concurrency: int
+    http_timeout_s: float
+    circuit_failure_threshold: int
+    circuit_reset_s: float
+    emotion_cache_ttl_s: float
+    emotion_cache_similarity: float
+    emotion_cache_hash_distance: int
+    emotion_cache_size: int
+    action_max_people: int
+    inference_threads: int
+    detector_threads: int
+    face_threads: int
+    action_threads: int
+    audio_threads: int
+    emotion_threads: int
+    action_min_interval_s: float
+    audio_gate_db: float
+    audio_max_batch: int
+    face_quality_threshold: float
+    face_min_size: int
+    enroll_workers: int
+    enroll_max_images: int
+    enroll_max_mb: float
+    endpoint_workers: int
+    endpoint_concurrency: int
+    endpoint_queue_size: int
+    loop_lag_interval_s: float
+    admin_token: str | None
+    profile_max_seconds: float
+    profile_interval_ms: float
+    face_tracked_ids: int
+    face_track_ttl_s: float
+    face_max_auto_samples: int
+    unknown_retention_days: float
+    memory_check_interval_s: float
+    memory_rss_budget_mb: float
+    memory_growth_budget_mb_per_h: float
+    person_left_s: float
+    event_min_interval_s: float
+    capture_event_min_interval_s: float
+    face_event_min_interval_s: float
+    emotion_event_min_interval_s: float
+    action_event_min_interval_s: float
+    memory_unknowns_tracked_budget: int
+    memory_faces_budget: int
+    memory_face_samples_budget: int
+    memory_unknown_faces_budget: int
+    memory_events_budget: int
+    memory_captures_budget: int
 
 
 def _get_bool(name: str, default: bool) -> bool:
@@ -73,7 +141,8 @@ def load_settings() -> Settings:
     action_window_s = float(os.getenv("ACTION_WINDOW_S", "2.0").strip())
     action_frames = int(os.getenv("ACTION_FRAMES", "16").strip())
     action_conf_threshold = float(os.getenv("ACTION_CONF_THRESHOLD", "0.95").strip())
-    audio_interval = int(os.getenv("AUDIO_INTERVAL", "5").strip())
+    # AUDIO_INTERVAL is the older name; .env files that still set it keep their classification rate.
+    audio_hop_s = float((os.getenv("AUDIO_HOP_S") or os.getenv("AUDIO_INTERVAL") or "1.0").strip())
     audio_window_s = float(os.getenv("AUDIO_WINDOW_S", "2.0").strip())
     audio_sample_rate = int(os.getenv("AUDIO_SAMPLE_RATE", "16000").strip())
     audio_threshold = float(os.getenv("AUDIO_THRESHOLD", "0.35").strip())
@@ -90,6 +159,87 @@ def load_settings() -> Settings:
     audio_local_model = os.getenv("AUDIO_LOCAL_MODEL", "").strip() or None
     emotion_conf_threshold = float(os.getenv("EMOTION_CONF_THRESHOLD", "0.4").strip())
     security_unknown_seconds = int(os.getenv("SECURITY_UNKNOWN_SECONDS", "5").strip())
+    clip_dir = os.getenv("CLIP_DIR", "clips").strip()
+    clip_pre_s = float(os.getenv("CLIP_PRE_S", "5").strip())
+    clip_post_s = float(os.getenv("CLIP_POST_S", "5").strip())
+    clip_fps = int(os.getenv("CLIP_FPS", "5").strip())
+    clip_segment_s = float(os.getenv("CLIP_SEGMENT_S", "4").strip())
+    clip_max_buffer_mb = int(os.getenv("CLIP_MAX_BUFFER_MB", "64").strip())
+    clip_jpeg_quality = int(os.getenv("CLIP_JPEG_QUALITY", "80").strip())
+    clip_triggers = [
+        trigger.strip()
+        for trigger in os.getenv("CLIP_TRIGGERS", "security_alert,audio_alert,action_detected").split(",")
+        if trigger.strip()
+    ]
+    upload_queue_path = os.getenv("UPLOAD_QUEUE_PATH", "uploads.db").strip()
+    upload_workers = int(os.getenv("UPLOAD_WORKERS", "2").strip())
+    upload_max_attempts = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "8").strip())
+    upload_backoff_max_s = float(os.getenv("UPLOAD_BACKOFF_MAX_S", "60").strip())
+    capture_dedup_distance = int(os.getenv("CAPTURE_DEDUP_DISTANCE", "6").strip())
+    capture_dedup_history = int(os.getenv("CAPTURE_DEDUP_HISTORY", "8").strip())
+    capture_thumbnail_width = int(os.getenv("CAPTURE_THUMBNAIL_WIDTH", "160").strip())
+    emotion_local_model = os.getenv("EMOTION_LOCAL_MODEL", "").strip() or None
+    emotion_local_labels = [
+        label.strip()
+        for label in os.getenv(
+            "EMOTION_LOCAL_LABELS", "angry,disgust,fear,happy,sad,surprise,neutral"
+        ).split(",")
+        if label.strip()
+    ]
+    emotion_input_size = int(os.getenv("EMOTION_INPUT_SIZE", "64").strip())
+    http_pool_size = int(os.getenv("HTTP_POOL_SIZE", "8").strip())
+    http_endpoint_concurrency = int(os.getenv("HTTP_ENDPOINT_CONCURRENCY", "2").strip())
+    http_timeout_s = float(os.getenv("HTTP_TIMEOUT_S", "10").strip())
+    circuit_failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3").strip())
+    circuit_reset_s = float(os.getenv("CIRCUIT_RESET_S", "30").strip())
+    emotion_cache_ttl_s = float(os.getenv("EMOTION_CACHE_TTL_S", "60").strip())
+    emotion_cache_similarity = float(os.getenv("EMOTION_CACHE_SIMILARITY", "0.6").strip())
+    emotion_cache_hash_distance = int(os.getenv("EMOTION_CACHE_HASH_DISTANCE", "8").strip())
+    emotion_cache_size = int(os.getenv("EMOTION_CACHE_SIZE", "64").strip())
+    action_max_people = int(os.getenv("ACTION_MAX_PEOPLE", "4").strip())
+    inference_threads = int(os.getenv("INFERENCE_THREADS", "0").strip()) or (os.cpu_count() or 4)
+    detector_threads = int(os.getenv("DETECTOR_THREADS", "4").strip())
+    face_threads = int(os.getenv("FACE_THREADS", "2").strip())
+    action_threads = int(os.getenv("ACTION_THREADS", "2").strip())
+    audio_threads = int(os.getenv("AUDIO_THREADS", "1").strip())
+    emotion_threads = int(os.getenv("EMOTION_THREADS", "1").strip())
+    action_min_interval_s = float(os.getenv("ACTION_MIN_INTERVAL_S", "2").strip())
+    audio_gate_db = float(os.getenv("AUDIO_GATE_DB", "-35").strip())
+    audio_max_batch = int(os.getenv("AUDIO_MAX_BATCH", "4").strip())
+    face_quality_threshold = float(os.getenv("FACE_QUALITY_THRESHOLD", "0.5").strip())
+    face_min_size = int(os.getenv("FACE_MIN_SIZE", "40").strip())
+    enroll_workers = int(os.getenv("ENROLL_WORKERS", "4").strip())
+    enroll_max_images = int(os.getenv("ENROLL_MAX_IMAGES", "10000").strip())
+    enroll_max_mb = float(os.getenv("ENROLL_MAX_MB", "1024").strip())
+    endpoint_workers = int(os.getenv("ENDPOINT_WORKERS", "4").strip())
+    endpoint_concurrency = int(os.getenv("ENDPOINT_CONCURRENCY", "2").strip())
+    endpoint_queue_size = int(os.getenv("ENDPOINT_QUEUE_SIZE", "8").strip())
+    loop_lag_interval_s = float(os.getenv("LOOP_LAG_INTERVAL_S", "0.5").strip())
+    admin_token = os.getenv("ADMIN_TOKEN", "").strip() or None
+    profile_max_seconds = float(os.getenv("PROFILE_MAX_SECONDS", "60").strip())
+    profile_interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "5").strip())
+    face_tracked_ids = int(os.getenv("FACE_TRACKED_IDS", "1000").strip())
+    face_track_ttl_s = float(os.getenv("FACE_TRACK_TTL_S", "3600").strip())
+    face_max_auto_samples = int(os.getenv("FACE_MAX_AUTO_SAMPLES", "50").strip())
+    unknown_retention_days = float(os.getenv("UNKNOWN_RETENTION_DAYS", "30").strip())
+    memory_check_interval_s = float(os.getenv("MEMORY_CHECK_INTERVAL_S", "60").strip())
+    memory_rss_budget_mb = float(os.getenv("MEMORY_RSS_BUDGET_MB", "4096").strip())
+    memory_growth_budget_mb_per_h = float(os.getenv("MEMORY_GROWTH_BUDGET_MB_PER_H", "64").strip())
+    person_left_s = float(os.getenv("PERSON_LEFT_S", "1.5").strip())
+    event_min_interval_s = float(os.getenv("EVENT_MIN_INTERVAL_S", "1").strip())
+    # Each service's event rate limit. Capture and emotion write to disk or call remote endpoints on every
+    # delivery, so they default to a slower rate; the others fall back to EVENT_MIN_INTERVAL_S.
+    capture_event_min_interval_s = float(os.getenv("CAPTURE_EVENT_MIN_INTERVAL_S", "5").strip())
+    face_event_min_interval_s = float(os.getenv("FACE_EVENT_MIN_INTERVAL_S", str(event_min_interval_s)).strip())
+    emotion_event_min_interval_s = float(os.getenv("EMOTION_EVENT_MIN_INTERVAL_S", "5").strip())
+    action_event_min_interval_s = float(os.getenv("ACTION_EVENT_MIN_INTERVAL_S", str(event_min_interval_s)).strip())
+    # Size budgets for the watchdog's structure and table probes; 0 reports the size without a budget.
+    memory_unknowns_tracked_budget = int(os.getenv("MEMORY_UNKNOWNS_TRACKED_BUDGET", "100").strip())
+    memory_faces_budget = int(os.getenv("MEMORY_FACES_BUDGET", "10000").strip())
+    memory_face_samples_budget = int(os.getenv("MEMORY_FACE_SAMPLES_BUDGET", "500000").strip())
+    memory_unknown_faces_budget = int(os.getenv("MEMORY_UNKNOWN_FACES_BUDGET", "100000").strip())
+    memory_events_budget = int(os.getenv("MEMORY_EVENTS_BUDGET", "1000000").strip())
+    memory_captures_budget = int(os.getenv("MEMORY_CAPTURES_BUDGET", "200000").strip())
 
     return Settings(
         model_path=model_path,
@@ -113,7 +263,7 @@ def load_settings() -> Settings:
         action_window_s=action_window_s,
         action_frames=action_frames,
         action_conf_threshold=action_conf_threshold,
-        audio_interval=audio_interval,
+        audio_hop_s=audio_hop_s,
         audio_window_s=audio_window_s,
         audio_sample_rate=audio_sample_rate,
         audio_threshold=audio_threshold,
@@ -123,4 +273,72 @@ def load_settings() -> Settings:
         audio_local_model=audio_local_model,
         emotion_conf_threshold=emotion_conf_threshold,
         security_unknown_seconds=security_unknown_seconds,
+        clip_dir=clip_dir,
+        clip_pre_s=clip_pre_s,
+        clip_post_s=clip_post_s,
+        clip_fps=clip_fps,
+        clip_segment_s=clip_segment_s,
+        clip_max_buffer_mb=clip_max_buffer_mb,
+        clip_jpeg_quality=clip_jpeg_quality,
+        clip_triggers=clip_triggers,
+        upload_queue_path=upload_queue_path,
+        upload_workers=upload_workers,
+        upload_max_attempts=upload_max_attempts,
+        upload_backoff_max_s=upload_backoff_max_s,
+        capture_dedup_distance=capture_dedup_distance,
+        capture_dedup_history=capture_dedup_history,
+        capture_thumbnail_width=capture_thumbnail_width,
+        emotion_local_model=emotion_local_model,
+        emotion_local_labels=emotion_local_labels,
+        emotion_input_size=emotion_input_size,
+        http_pool_size=http_pool_size,
+        http_endpoint_concurrency=http_endpoint_concurrency,
+        http_timeout_s=http_timeout_s,
+        circuit_failure_threshold=circuit_failure_threshold,
+        circuit_reset_s=circuit_reset_s,
+        emotion_cache_ttl_s=emotion_cache_ttl_s,
+        emotion_cache_similarity=emotion_cache_similarity,
+        emotion_cache_hash_distance=emotion_cache_hash_distance,
+        emotion_cache_size=emotion_cache_size,
+        action_max_people=action_max_people,
+        inference_threads=inference_threads,
+        detector_threads=detector_threads,
+        face_threads=face_threads,
+        action_threads=action_threads,
+        audio_threads=audio_threads,
+        emotion_threads=emotion_threads,
+        action_min_interval_s=action_min_interval_s,
+        audio_gate_db=audio_gate_db,
+        audio_max_batch=audio_max_batch,
+        face_quality_threshold=face_quality_threshold,
+        face_min_size=face_min_size,
+        enroll_workers=enroll_workers,
+        enroll_max_images=enroll_max_images,
+        enroll_max_mb=enroll_max_mb,
+        endpoint_workers=endpoint_workers,
+        endpoint_concurrency=endpoint_concurrency,
+        endpoint_queue_size=endpoint_queue_size,
+        loop_lag_interval_s=loop_lag_interval_s,
+        admin_token=admin_token,
+        profile_max_seconds=profile_max_seconds,
+        profile_interval_ms=profile_interval_ms,
+        face_tracked_ids=face_tracked_ids,
+        face_track_ttl_s=face_track_ttl_s,
+        face_max_auto_samples=face_max_auto_samples,
+        unknown_retention_days=unknown_retention_days,
+        memory_check_interval_s=memory_check_interval_s,
+        memory_rss_budget_mb=memory_rss_budget_mb,
+        memory_growth_budget_mb_per_h=memory_growth_budget_mb_per_h,
+        person_left_s=person_left_s,
+        event_min_interval_s=event_min_interval_s,
+        capture_event_min_interval_s=capture_event_min_interval_s,
+        face_event_min_interval_s=face_event_min_interval_s,
+        emotion_event_min_interval_s=emotion_event_min_interval_s,
+        action_event_min_interval_s=action_event_min_interval_s,
+        memory_unknowns_tracked_budget=memory_unknowns_tracked_budget,
+        memory_faces_budget=memory_faces_budget,
+        memory_face_samples_budget=memory_face_samples_budget,
+        memory_unknown_faces_budget=memory_unknown_faces_budget,
+        memory_events_budget=memory_events_budget,
+        memory_captures_budget=memory_captures_budget,
     )
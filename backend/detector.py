@@ -9,30 +9,68 @@ import numpy as np
 
 from ultralytics import YOLO
 
-from utils import now_utc
+from bus import EventBus
+from metrics import stage
+from tracing import new_trace, result_trace
+from utils import box_iou, now_utc
+
+# Minimum overlap for a person box to continue an existing track.
+_TRACK_IOU = 0.3
 
 
 class Detector:
-    def __init__(self, model_path: str, use_gpu: bool) -> None:
+    def __init__(
+        self,
+        model_path: str,
+        use_gpu: bool,
+        inference=None,
+        bus: EventBus | None = None,
+        person_left_s: float = 1.5,
+    ) -> None:
         if not model_path:
             raise RuntimeError("MODEL_PATH is required")
-        self.model = YOLO(model_path)
+        self.model_path = model_path
+        self.model = None
         self.device = "cuda" if use_gpu else "cpu"
-        self.model.to(self.device)
+        self.inference = inference
+        self.bus = bus or EventBus()
+        self.person_left_s = max(0.0, float(person_left_s))
 
         self._lock = threading.Lock()
         self._latest_frame: np.ndarray | None = None
         self._latest_raw: np.ndarray | None = None
         self._latest_detections: list[dict[str, Any]] = []
         self._latest_ts: str | None = None
+        self._latest_trace: dict[str, Any] | None = None
+        self._latest_result_trace: dict[str, Any] | None = None
+        self._frame_seq = 0
+        self._frame_read_at: float | None = None
+        self._fps = 0.0
+
+        # Person tracks by box overlap between frames; only the detector thread touches them.
+        self._tracks: dict[int, dict[str, Any]] = {}
+        self._next_track_id = 1
+        self._person_present = False
+        self._person_seen_at = 0.0
 
         self._stop = threading.Event()
         self._thread: threading.Thread | None = None
         self._ready = False
 
+    def load(self) -> None:
+        if self.model is not None:
+            return
+        model = YOLO(self.model_path)
+        model.to(self.device)
+        self.model = model
+
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
     def start(self, frame_source) -> None:
         if self._thread is not None:
             return
+        self.load()
         self._thread = threading.Thread(target=self._loop, args=(frame_source,), daemon=True)
         self._thread.start()
 
@@ -44,74 +82,163 @@ class Detector:
     def is_ready(self) -> bool:
         return self._ready
 
-    def get_latest(self) -> tuple[str | None, list[dict[str, Any]]]:
+    def get_stats(self) -> dict[str, Any]:
         with self._lock:
-            return self._latest_ts, list(self._latest_detections)
+            read_at = self._frame_read_at
+            return {
+                "frames": self._frame_seq,
+                "fps": round(self._fps, 2),
+                "frame_age_s": round(time.monotonic() - read_at, 3) if read_at is not None else None,
+            }
+
+    def get_latest(self) -> tuple[str | None, list[dict[str, Any]], dict[str, Any] | None]:
+        with self._lock:
+            return self._latest_ts, list(self._latest_detections), self._latest_result_trace
+
+    def person_present(self) -> bool:
+        # Unlike has_label("person"), this stays true through brief detection dropouts.
+        return self._person_present
 
     def has_label(self, label: str) -> bool:
         with self._lock:
             return any(det.get("label") == label for det in self._latest_detections)
 
-    def get_latest_frame(self, annotated: bool = True):
+    def get_latest_frame(self, annotated: bool = True, copy: bool = True):
+        # Published frames are read-only, so readers that only encode or crop can skip the copy.
         with self._lock:
             frame = self._latest_frame if annotated else self._latest_raw
             if frame is None:
                 return None
-            return frame.copy()
+            return frame.copy() if copy else frame
+
+    def get_frame(self, annotated: bool = False, copy: bool = True) -> tuple[np.ndarray | None, dict[str, Any] | None]:
+        # The frame together with its trace, so results computed from it can be tied back to the capture.
+        with self._lock:
+            frame = self._latest_frame if annotated else self._latest_raw
+            if frame is None:
+                return None, None
+            return (frame.copy() if copy else frame), self._latest_trace
+
+    def get_latest_raw(self) -> tuple[int, np.ndarray | None, list[dict[str, Any]], dict[str, Any] | None]:
+        with self._lock:
+            if self._latest_raw is None:
+                return self._frame_seq, None, [], None
+            return self._frame_seq, self._latest_raw, list(self._latest_detections), self._latest_trace
+
+    def _predict(self, frame: np.ndarray):
+        kwargs = {"source": frame, "verbose": False, "device": self.device, "imgsz": 640, "conf": 0.25}
+        if self.inference is None:
+            return self.model.predict(**kwargs)
+        return self.inference.run("detector", self.model.predict, **kwargs)
+
+    def _postprocess(self, frame: np.ndarray, results) -> list[dict[str, Any]]:
+        detections: list[dict[str, Any]] = []
+        if results:
+            result = results[0]
+            for box in result.boxes:
+                xyxy = box.xyxy[0].cpu().numpy().tolist()
+                x1, y1, x2, y2 = xyxy
+                w = max(0, x2 - x1)
+                h = max(0, y2 - y1)
+                conf = float(box.conf[0].cpu().item())
+                cls_id = int(box.cls[0].cpu().item())
+                label = self.model.names.get(cls_id, str(cls_id))
+
+                detections.append(
+                    {
+                        "label": label,
+                        "confidence": round(conf, 4),
+                        "bbox": [int(x1), int(y1), int(w), int(h)],
+                    }
+                )
+
+                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+                text = f"{label} {conf:.2f}"
+                cv2.putText(
+                    frame,
+                    text,
+                    (int(x1), max(0, int(y1) - 8)),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5,
+                    (0, 255, 0),
+                    1,
+                    cv2.LINE_AA,
+                )
+        return detections
+
+    def _track_people(self, detections: list[dict[str, Any]], now: float) -> list[tuple[str, dict[str, Any]]]:
+        boxes = [
+            [x, y, x + w, y + h] for x, y, w, h in (det["bbox"] for det in detections if det.get("label") == "person")
+        ]
+        events: list[tuple[str, dict[str, Any]]] = []
+        unmatched = dict(self._tracks)
+        for box in boxes:
+            track_id = None
+            best = _TRACK_IOU
+            for candidate, track in unmatched.items():
+                overlap = box_iou(box, track["bbox"])
+                if overlap >= best:
+                    track_id, best = candidate, overlap
+            if track_id is None:
+                track_id = self._next_track_id
+                self._next_track_id += 1
+                events.append(("track_new", {"track_id": track_id, "bbox": box}))
+            else:
+                unmatched.pop(track_id)
+            self._tracks[track_id] = {"bbox": box, "seen_at": now}
+        for track_id, track in unmatched.items():
+            if now - track["seen_at"] > self.person_left_s:
+                del self._tracks[track_id]
+                events.append(("track_lost", {"track_id": track_id}))
+
+        if boxes:
+            self._person_seen_at = now
+            if not self._person_present:
+                self._person_present = True
+                events.insert(0, ("person_appeared", {"people": len(boxes)}))
+        elif self._person_present and now - self._person_seen_at > self.person_left_s:
+            self._person_present = False
+            events.append(("person_left", {}))
+        return events
 
     def _loop(self, frame_source) -> None:
         while not self._stop.is_set():
-            frame = frame_source()
+            with stage("camera_read"):
+                frame = frame_source()
             if frame is None:
                 time.sleep(0.02)
                 continue
+            read_at = time.monotonic()
+            # Only this thread advances the sequence, so the next id can be taken before publishing.
+            trace = new_trace(self._frame_seq + 1, now_utc().isoformat(), read_at)
 
             raw = frame.copy()
-            results = self.model.predict(
-                source=frame,
-                verbose=False,
-                device=self.device,
-                imgsz=640,
-                conf=0.25,
-            )
-            detections: list[dict[str, Any]] = []
-
-            if results:
-                result = results[0]
-                for box in result.boxes:
-                    xyxy = box.xyxy[0].cpu().numpy().tolist()
-                    x1, y1, x2, y2 = xyxy
-                    w = max(0, x2 - x1)
-                    h = max(0, y2 - y1)
-                    conf = float(box.conf[0].cpu().item())
-                    cls_id = int(box.cls[0].cpu().item())
-                    label = self.model.names.get(cls_id, str(cls_id))
-
-                    detections.append(
-                        {
-                            "label": label,
-                            "confidence": round(conf, 4),
-                            "bbox": [int(x1), int(y1), int(w), int(h)],
-                        }
-                    )
-
-                    cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-                    text = f"{label} {conf:.2f}"
-                    cv2.putText(
-                        frame,
-                        text,
-                        (int(x1), max(0, int(y1) - 8)),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.5,
-                        (0, 255, 0),
-                        1,
-                        cv2.LINE_AA,
-                    )
+            with stage("detect_predict"):
+                results = self._predict(frame)
+
+            with stage("detect_postprocess"):
+                detections = self._postprocess(frame, results)
 
             ts = now_utc().isoformat()
+            published = result_trace(trace, "detection")
+            frame.flags.writeable = False
+            raw.flags.writeable = False
             with self._lock:
                 self._latest_frame = frame
                 self._latest_raw = raw
                 self._latest_detections = detections
                 self._latest_ts = ts
+                self._latest_trace = trace
+                self._latest_result_trace = published
+                self._frame_seq += 1
+                if self._frame_read_at is not None:
+                    interval = max(1e-6, read_at - self._frame_read_at)
+                    self._fps = 1.0 / interval if self._fps == 0.0 else 0.9 * self._fps + 0.1 / interval
+                self._frame_read_at = read_at
                 self._ready = True
+
+            # Published after the frame is visible, so subscribers that react read this frame or a newer one.
+            self.bus.publish("frame", {"frame_id": trace["frame_id"]})
+            for topic, data in self._track_people(detections, read_at):
+                data["frame_id"] = trace["frame_id"]
+                self.bus.publish(topic, data)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import Any
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from inference import onnx_session_options
+
+
+class LocalEmotionModel:
+    def __init__(
+        self,
+        model_path: str,
+        labels: list[str],
+        input_size: int = 64,
+        top_k: int = 3,
+        inference=None,
+    ) -> None:
+        self.inference = inference
+        if inference is not None:
+            options = onnx_session_options(inference.threads_for("emotion"))
+        else:
+            options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.labels = list(labels)
+        self.top_k = max(1, int(top_k))
+
+        # Accept both NCHW and NHWC models; take spatial size and channels from the graph when static.
+        shape = list(model_input.shape)
+        self._channels_last = len(shape) == 4 and shape[-1] in (1, 3)
+        channels = shape[-1] if self._channels_last else (shape[1] if len(shape) == 4 else 1)
+        self._channels = channels if isinstance(channels, int) else 1
+        spatial = shape[1] if self._channels_last else (shape[2] if len(shape) == 4 else None)
+        self.input_size = spatial if isinstance(spatial, int) else int(input_size)
+
+    def _preprocess(self, crops: list[np.ndarray]) -> np.ndarray:
+        size = (self.input_size, self.input_size)
+        batch = np.empty((len(crops), self.input_size, self.input_size, self._channels), dtype=np.float32)
+        for i, crop in enumerate(crops):
+            resized = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+            if self._channels == 1:
+                batch[i, :, :, 0] = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+            else:
+                batch[i] = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        batch *= 1.0 / 255.0
+        if not self._channels_last:
+            batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+        return batch
+
+    def classify(self, crops: list[np.ndarray]) -> list[list[dict[str, Any]]]:
+        if not crops:
+            return []
+        feed = {self._input_name: self._preprocess(crops)}
+        if self.inference is None:
+            logits = self._session.run(None, feed)[0]
+        else:
+            logits = self.inference.run("emotion", self._session.run, None, feed)[0]
+        logits = logits.reshape(len(crops), -1)
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        order = np.argsort(-probs, axis=1)[:, : self.top_k]
+        results = []
+        for row, indices in zip(probs, order):
+            results.append(
+                [
+                    {
+                        "label": self.labels[idx] if idx < len(self.labels) else str(idx),
+                        "score": float(row[idx]),
+                    }
+                    for idx in indices
+                ]
+            )
+        return results
+
+
+def crop_faces(image_bgr: np.ndarray, faces: list[dict[str, Any]], margin: float = 0.1) -> list[np.ndarray]:
+    height, width = image_bgr.shape[:2]
+    crops = []
+    for face in faces:
+        x1, y1, x2, y2 = face["bbox"]
+        pad_x = (x2 - x1) * margin
+        pad_y = (y2 - y1) * margin
+        left = max(0, int(x1 - pad_x))
+        top = max(0, int(y1 - pad_y))
+        right = min(width, int(x2 + pad_x))
+        bottom = min(height, int(y2 + pad_y))
+        if right <= left or bottom <= top:
+            crops.append(np.zeros((1, 1, 3), dtype=image_bgr.dtype))
+            continue
+        crops.append(image_bgr[top:bottom, left:right])
+    return crops
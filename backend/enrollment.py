@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+from typing import Any, BinaryIO, Callable
+
+import cv2
+import numpy as np
+
+_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+_NUMBER_SUFFIX = re.compile(r"[\s_\-]*\d+$")
+
+# (source file, person name, reader returning the encoded image bytes)
+_Item = tuple[str, str | None, Callable[[], bytes]]
+
+
+class EnrollmentError(ValueError):
+    pass
+
+
+class EnrollmentLimitError(EnrollmentError):
+    pass
+
+
+def person_name(path: str) -> str | None:
+    parts = [part for part in PurePosixPath(path.replace("\\", "/")).parts if part not in ("", ".", "/")]
+    if not parts:
+        return None
+    # "alice/1.jpg" belongs to alice; a bare "alice_2.jpg" drops its trailing number.
+    if len(parts) > 1:
+        name = parts[-2]
+    else:
+        name = _NUMBER_SUFFIX.sub("", PurePosixPath(parts[-1]).stem)
+    return name.strip() or None
+
+
+def _is_image(path: str) -> bool:
+    name = PurePosixPath(path.replace("\\", "/"))
+    if any(part.startswith(".") or part == "__MACOSX" for part in name.parts):
+        return False
+    return name.suffix.lower() in _IMAGE_EXTENSIONS
+
+
+class BulkEnroller:
+    def __init__(self, face_service, face_db, workers: int, max_images: int, max_mb: float) -> None:
+        self.face_service = face_service
+        self.face_db = face_db
+        self.workers = max(1, int(workers))
+        self.max_images = max(1, int(max_images))
+        self.max_bytes = int(max(1.0, float(max_mb)) * 1024 * 1024)
+
+    def _collect(self, files: list[tuple[str, BinaryIO]], manifest: dict[str, str]) -> tuple[list[_Item], list[dict[str, Any]]]:
+        items: list[_Item] = []
+        skipped: list[dict[str, Any]] = []
+        total = 0
+        for filename, fileobj in files:
+            if zipfile.is_zipfile(fileobj):
+                fileobj.seek(0)
+                # is_zipfile only looks for the end-of-archive record; a corrupt directory still fails here.
+                try:
+                    archive = zipfile.ZipFile(fileobj)
+                except (zipfile.BadZipFile, zipfile.LargeZipFile, OSError, EOFError) as exc:
+                    raise EnrollmentError(f"invalid_archive: {filename}: {exc}") from exc
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    source = f"{filename}:{info.filename}"
+                    if not _is_image(info.filename):
+                        skipped.append({"file": source, "ok": False, "error": "not_an_image"})
+                        continue
+                    # Checked against the declared size before anything is decompressed.
+                    total += info.file_size
+                    name = manifest.get(info.filename) or person_name(info.filename)
+                    items.append((source, name, lambda archive=archive, info=info: archive.read(info)))
+            else:
+                fileobj.seek(0)
+                name = manifest.get(filename) or person_name(filename)
+                items.append((filename, name, fileobj.read))
+            if len(items) > self.max_images:
+                raise EnrollmentLimitError("too_many_images")
+            if total > self.max_bytes:
+                raise EnrollmentLimitError("archive_too_large")
+        return items, skipped
+
+    def _embed(self, item: _Item) -> tuple[dict[str, Any], np.ndarray | None]:
+        source, name, read = item
+        report: dict[str, Any] = {"file": source, "name": name, "ok": False}
+        if not name:
+            report["error"] = "name_missing"
+            return report, None
+        try:
+            data = read()
+        except (OSError, zipfile.BadZipFile, RuntimeError) as exc:
+            report["error"] = f"read_failed: {exc}"
+            return report, None
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        del data
+        if img is None:
+            report["error"] = "invalid_image"
+            return report, None
+        embedding, meta = self.face_service.get_embedding(img)
+        if "quality" in meta:
+            report["quality"] = meta["quality"]
+        if embedding is None:
+            report["error"] = meta.get("error", "no_face")
+            return report, None
+        report["faces"] = meta.get("faces")
+        return report, embedding
+
+    def run(self, files: list[tuple[str, BinaryIO]], manifest: dict[str, str] | None = None) -> dict[str, Any]:
+        items, skipped = self._collect(files, manifest or {})
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self._embed, items))
+
+        by_name: dict[str, list[tuple[dict[str, Any], np.ndarray]]] = {}
+        for report, embedding in results:
+            if embedding is not None:
+                by_name.setdefault(report["name"], []).append((report, embedding))
+
+        people = []
+        for name, entries in by_name.items():
+            try:
+                face_id, created = self.face_db.enroll(name, [embedding for _, embedding in entries])
+            except Exception as exc:
+                for report, _ in entries:
+                    report["error"] = f"store_failed: {exc}"
+                continue
+            for report, _ in entries:
+                report["ok"] = True
+                report["face_id"] = face_id
+            people.append({"name": name, "id": face_id, "created": created, "samples": len(entries)})
+
+        report = [item for item, _ in results] + skipped
+        enrolled = sum(1 for item in report if item["ok"])
+        return {
+            "ok": True,
+            "images": len(report),
+            "enrolled": enrolled,
+            "failed": len(report) - enrolled,
+            "people": people,
+            "report": report,
+        }
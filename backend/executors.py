@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class OverloadedError(RuntimeError):
+    pass
+
+
+class EndpointLimiter:
+    def __init__(self, pool: ThreadPoolExecutor, name: str, concurrency: int, queue_size: int) -> None:
+        self.pool = pool
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        # Requests beyond running + queued are shed immediately instead of piling up.
+        self.capacity = self.concurrency + max(0, int(queue_size))
+        self._running = asyncio.Semaphore(self.concurrency)
+        self._admitted = 0
+        self._active = 0
+        self.completed = 0
+        self.errors = 0
+        self.shed = 0
+        self._run_total = 0.0
+        self._run_max = 0.0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        # Every counter is touched from the event loop thread only, so no lock is needed.
+        if self._admitted >= self.capacity:
+            self.shed += 1
+            raise OverloadedError(f"{self.name} is at capacity")
+        self._admitted += 1
+        queued = time.perf_counter()
+        try:
+            async with self._running:
+                started = time.perf_counter()
+                self._active += 1
+                loop = asyncio.get_running_loop()
+                try:
+                    return await loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+                except Exception:
+                    self.errors += 1
+                    raise
+                finally:
+                    self._active -= 1
+                    finished = time.perf_counter()
+                    self.completed += 1
+                    self._run_total += finished - started
+                    self._run_max = max(self._run_max, finished - started)
+                    self._wait_total += started - queued
+                    self._wait_max = max(self._wait_max, started - queued)
+        finally:
+            self._admitted -= 1
+
+    def get_stats(self) -> dict[str, Any]:
+        completed = max(1, self.completed)
+        return {
+            "concurrency": self.concurrency,
+            "capacity": self.capacity,
+            "running": self._active,
+            "queued": self._admitted - self._active,
+            "completed": self.completed,
+            "errors": self.errors,
+            "shed": self.shed,
+            "wait_avg_ms": round(self._wait_total / completed * 1000, 2),
+            "wait_max_ms": round(self._wait_max * 1000, 2),
+            "run_avg_ms": round(self._run_total / completed * 1000, 2),
+            "run_max_ms": round(self._run_max * 1000, 2),
+        }
+
+
+class LoopLagMonitor:
+    def __init__(self, interval_s: float = 0.5) -> None:
+        self.interval_s = max(0.05, float(interval_s))
+        self._task: asyncio.Task | None = None
+        self.samples = 0
+        self.last_s = 0.0
+        self.max_s = 0.0
+        self._total = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Any time past the requested sleep is time the loop spent blocked on something else.
+            expected = loop.time() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            lag = max(0.0, loop.time() - expected)
+            self.samples += 1
+            self.last_s = lag
+            self.max_s = max(self.max_s, lag)
+            self._total += lag
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "interval_s": self.interval_s,
+            "samples": self.samples,
+            "last_ms": round(self.last_s * 1000, 2),
+            "avg_ms": round(self._total / max(1, self.samples) * 1000, 2),
+            "max_ms": round(self.max_s * 1000, 2),
+        }
@@ -3,19 +3,28 @@ from __future__ import annotations
 import json
 import sqlite3
 import threading
-from datetime import datetime
-from typing import Iterable
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
 
 import numpy as np
 
+from metrics import stage
+
 
 class FaceDB:
     def __init__(self, path: str) -> None:
         self._lock = threading.Lock()
         self._conn = sqlite3.connect(path, check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
+        self._event_listeners: list[Callable[[int, str, str | None], None]] = []
         self._init_db()
 
+    @contextmanager
+    def _write(self):
+        with stage("db_write"), self._lock, self._conn:
+            yield
+
     def _init_db(self) -> None:
         with self._conn:
             self._conn.execute(
@@ -51,10 +60,15 @@ class FaceDB:
                     name TEXT,
                     score REAL,
                     bbox TEXT,
-                    created_at TEXT NOT NULL
+                    created_at TEXT NOT NULL,
+                    frame_id INTEGER,
+                    frame_captured_at TEXT
                 )
                 """
             )
+            # Databases created before frame tracing lack these columns.
+            self._add_column("events", "frame_id", "INTEGER")
+            self._add_column("events", "frame_captured_at", "TEXT")
             self._conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS face_samples (
@@ -62,21 +76,97 @@ class FaceDB:
                     face_id INTEGER NOT NULL,
                     embedding BLOB NOT NULL,
                     dim INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    auto INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Samples stored before the column existed have no known origin, so they stay enrolled (auto = 0)
+            # and the recognition cap never prunes them.
+            self._add_column("face_samples", "auto", "INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_face_samples_face_id ON face_samples (face_id, auto)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS captures (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    storage_path TEXT,
+                    captured_at TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    upload_status TEXT NOT NULL,
+                    upload_url TEXT,
+                    job_id INTEGER,
+                    labels TEXT,
+                    duplicates INTEGER NOT NULL DEFAULT 0,
+                    thumbnail BLOB
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_captures_captured_at ON captures (captured_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_captures_job_id ON captures (job_id)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_faces_name ON faces (name)")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS clips (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id INTEGER,
+                    reason TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    segments INTEGER NOT NULL,
+                    frames INTEGER NOT NULL,
+                    started_at TEXT NOT NULL,
+                    ended_at TEXT NOT NULL,
                     created_at TEXT NOT NULL
                 )
                 """
             )
 
+    def _add_column(self, table: str, column: str, decl: str) -> None:
+        columns = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
     def add(self, name: str, embedding: np.ndarray) -> int:
         emb = np.asarray(embedding, dtype=np.float32)
         payload = emb.tobytes()
-        with self._lock, self._conn:
+        with self._write():
             cur = self._conn.execute(
                 "INSERT INTO faces (name, embedding, dim, created_at) VALUES (?, ?, ?, ?)",
                 (name, payload, emb.size, datetime.utcnow().isoformat()),
             )
             return int(cur.lastrowid)
 
+    def enroll(self, name: str, embeddings: list[np.ndarray]) -> tuple[int, bool]:
+        embs = [np.asarray(embedding, dtype=np.float32) for embedding in embeddings]
+        if not embs:
+            raise ValueError("no embeddings to enroll")
+        now = datetime.utcnow().isoformat()
+        # One transaction per person: either every sample is stored or none are.
+        with self._write():
+            cur = self._conn.execute("SELECT id FROM faces WHERE name = ? ORDER BY id DESC LIMIT 1", (name,))
+            row = cur.fetchone()
+            created = row is None
+            if created:
+                first = embs.pop(0)
+                cur = self._conn.execute(
+                    "INSERT INTO faces (name, embedding, dim, created_at) VALUES (?, ?, ?, ?)",
+                    (name, first.tobytes(), first.size, now),
+                )
+                face_id = int(cur.lastrowid)
+            else:
+                face_id = int(row["id"])
+            self._conn.executemany(
+                "INSERT INTO face_samples (face_id, embedding, dim, created_at) VALUES (?, ?, ?, ?)",
+                [(face_id, emb.tobytes(), emb.size, now) for emb in embs],
+            )
+        return face_id, created
+
     def list_names(self) -> list[dict]:
         with self._lock:
             cur = self._conn.execute(
@@ -106,15 +196,43 @@ class FaceDB:
             name = id_to_name.get(face_id, "unknown")
             yield face_id, name, emb
 
-    def add_face_sample(self, face_id: int, embedding: np.ndarray) -> int:
+    def add_face_sample(
+        self, face_id: int, embedding: np.ndarray, auto: bool = False, max_auto: int | None = None
+    ) -> int:
         emb = np.asarray(embedding, dtype=np.float32)
         payload = emb.tobytes()
-        with self._lock, self._conn:
+        with self._write():
             cur = self._conn.execute(
-                "INSERT INTO face_samples (face_id, embedding, dim, created_at) VALUES (?, ?, ?, ?)",
-                (face_id, payload, emb.size, datetime.utcnow().isoformat()),
+                "INSERT INTO face_samples (face_id, embedding, dim, created_at, auto) VALUES (?, ?, ?, ?, ?)",
+                (face_id, payload, emb.size, datetime.utcnow().isoformat(), int(auto)),
             )
-            return int(cur.lastrowid)
+            sample_id = int(cur.lastrowid)
+            if auto and max_auto:
+                # Samples added by recognition roll over; enrolled samples are never dropped.
+                self._conn.execute(
+                    """
+                    DELETE FROM face_samples
+                    WHERE face_id = ? AND auto = 1 AND id NOT IN (
+                        SELECT id FROM face_samples WHERE face_id = ? AND auto = 1 ORDER BY id DESC LIMIT ?
+                    )
+                    """,
+                    (face_id, face_id, int(max_auto)),
+                )
+            return sample_id
+
+    def prune_unknowns(self, max_age_days: float) -> int:
+        if max_age_days <= 0:
+            return 0
+        cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).isoformat()
+        with self._write():
+            cur = self._conn.execute("DELETE FROM unknown_faces WHERE last_seen < ?", (cutoff,))
+            return int(cur.rowcount)
+
+    def count_rows(self, table: str) -> int:
+        if table not in ("faces", "face_samples", "unknown_faces", "events", "captures", "clips"):
+            raise ValueError(f"unknown table {table}")
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
 
     def iter_unknown_embeddings(self) -> Iterable[tuple[int, np.ndarray]]:
         with self._lock:
@@ -129,7 +247,7 @@ class FaceDB:
     def update_unknown(self, unknown_id: int, embedding: np.ndarray) -> None:
         emb = np.asarray(embedding, dtype=np.float32)
         payload = emb.tobytes()
-        with self._lock, self._conn:
+        with self._write():
             self._conn.execute(
                 "UPDATE unknown_faces SET embedding = ?, dim = ?, last_seen = ?, sightings = sightings + 1 WHERE id = ?",
                 (payload, emb.size, datetime.utcnow().isoformat(), unknown_id),
@@ -139,7 +257,7 @@ class FaceDB:
         emb = np.asarray(embedding, dtype=np.float32)
         payload = emb.tobytes()
         now = datetime.utcnow().isoformat()
-        with self._lock, self._conn:
+        with self._write():
             cur = self._conn.execute(
                 "INSERT INTO unknown_faces (embedding, dim, first_seen, last_seen, sightings) VALUES (?, ?, ?, ?, 1)",
                 (payload, emb.size, now, now),
@@ -154,13 +272,14 @@ class FaceDB:
         name: str | None,
         score: float | None,
         bbox: list[float] | None,
-    ) -> None:
+        trace: dict | None = None,
+    ) -> int:
         payload = json.dumps(bbox) if bbox else None
-        with self._lock, self._conn:
-            self._conn.execute(
+        with self._write():
+            cur = self._conn.execute(
                 """
-                INSERT INTO events (event_type, face_type, face_id, name, score, bbox, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO events (event_type, face_type, face_id, name, score, bbox, created_at, frame_id, frame_captured_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     event_type,
@@ -170,14 +289,167 @@ class FaceDB:
                     score,
                     payload,
                     datetime.utcnow().isoformat(),
+                    trace["frame_id"] if trace else None,
+                    trace["captured_at"] if trace else None,
                 ),
             )
+            event_id = int(cur.lastrowid)
+        for listener in list(self._event_listeners):
+            try:
+                listener(event_id, event_type, name)
+            except Exception:
+                continue
+        return event_id
+
+    def add_event_listener(self, listener: Callable[[int, str, str | None], None]) -> None:
+        self._event_listeners.append(listener)
+
+    def add_clip(
+        self,
+        event_id: int | None,
+        reason: str,
+        path: str,
+        segments: int,
+        frames: int,
+        started_at: str,
+        ended_at: str,
+    ) -> int:
+        with self._write():
+            cur = self._conn.execute(
+                """
+                INSERT INTO clips (event_id, reason, path, segments, frames, started_at, ended_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    event_id,
+                    reason,
+                    path,
+                    segments,
+                    frames,
+                    started_at,
+                    ended_at,
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+            return int(cur.lastrowid)
+
+    def list_clips(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                SELECT id, event_id, reason, path, segments, frames, started_at, ended_at, created_at
+                FROM clips
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (limit,),
+            )
+            rows = cur.fetchall()
+        return [dict(row) for row in rows]
+
+    def add_capture(
+        self,
+        path: str,
+        storage_path: str | None,
+        captured_at: str,
+        reason: str,
+        upload_status: str,
+        job_id: int | None,
+        labels: list[str],
+        thumbnail: bytes | None,
+    ) -> int:
+        with self._write():
+            cur = self._conn.execute(
+                """
+                INSERT INTO captures (path, storage_path, captured_at, reason, upload_status, job_id, labels, thumbnail)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    path,
+                    storage_path,
+                    captured_at,
+                    reason,
+                    upload_status,
+                    job_id,
+                    json.dumps(labels),
+                    thumbnail,
+                ),
+            )
+            return int(cur.lastrowid)
+
+    def update_capture_upload(self, job_id: int, upload_status: str, upload_url: str | None) -> None:
+        with self._write():
+            self._conn.execute(
+                "UPDATE captures SET upload_status = ?, upload_url = ? WHERE job_id = ?",
+                (upload_status, upload_url, job_id),
+            )
+
+    def add_capture_duplicate(self, capture_id: int) -> None:
+        with self._write():
+            self._conn.execute(
+                "UPDATE captures SET duplicates = duplicates + 1 WHERE id = ?",
+                (capture_id,),
+            )
+
+    def list_captures(
+        self,
+        limit: int = 50,
+        before_id: int | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        reason: str | None = None,
+    ) -> list[dict]:
+        clauses = []
+        params: list = []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if start:
+            clauses.append("captured_at >= ?")
+            params.append(start)
+        if end:
+            clauses.append("captured_at < ?")
+            params.append(end)
+        if reason:
+            clauses.append("reason = ?")
+            params.append(reason)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        with self._lock:
+            cur = self._conn.execute(
+                f"""
+                SELECT id, path, storage_path, captured_at, reason, upload_status, upload_url, job_id, labels, duplicates
+                FROM captures
+                {where}
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                params,
+            )
+            rows = cur.fetchall()
+        results = []
+        for row in rows:
+            item = dict(row)
+            try:
+                item["labels"] = json.loads(item["labels"]) if item.get("labels") else []
+            except json.JSONDecodeError:
+                item["labels"] = []
+            results.append(item)
+        return results
+
+    def get_capture_thumbnail(self, capture_id: int) -> bytes | None:
+        with self._lock:
+            cur = self._conn.execute("SELECT thumbnail FROM captures WHERE id = ?", (capture_id,))
+            row = cur.fetchone()
+        if row is None or row["thumbnail"] is None:
+            return None
+        return bytes(row["thumbnail"])
 
     def list_events(self, limit: int = 100) -> list[dict]:
         with self._lock:
             cur = self._conn.execute(
                 """
-                SELECT id, event_type, face_type, face_id, name, score, bbox, created_at
+                SELECT id, event_type, face_type, face_id, name, score, bbox, created_at, frame_id, frame_captured_at
                 FROM events
                 ORDER BY id DESC
                 LIMIT ?
@@ -1,38 +1,178 @@
 from __future__ import annotations
 
+import threading
 from typing import Any
 
+import cv2
 import numpy as np
+import onnxruntime as ort
 from insightface.app import FaceAnalysis
+from insightface.utils import face_align
+
+from inference import onnx_session_options
+from metrics import stage
+
+_BLUR_REFERENCE = 100.0
+_MAX_YAW_OFFSET = 0.4
 
 
 class FaceService:
-    def __init__(self, model_name: str, use_gpu: bool) -> None:
+    def __init__(
+        self,
+        model_name: str,
+        use_gpu: bool,
+        inference=None,
+        min_quality: float = 0.0,
+        min_size: int = 40,
+    ) -> None:
         providers = ["CPUExecutionProvider"]
         if use_gpu:
             providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
-        self._app = FaceAnalysis(name=model_name, providers=providers)
-        self._app.prepare(ctx_id=0 if use_gpu else -1, det_size=(640, 640))
-
-    def get_faces(self, image_bgr: np.ndarray) -> list[dict[str, Any]]:
-        faces = self._app.get(image_bgr)
-        results: list[dict[str, Any]] = []
-        for face in faces:
-            results.append(
-                {
-                    "bbox": [float(v) for v in face.bbox],
-                    "embedding": face.embedding,
-                }
+        self.model_name = model_name
+        self.use_gpu = use_gpu
+        self.providers = providers
+        self.inference = inference
+        self.min_quality = float(min_quality)
+        self.min_size = max(1, int(min_size))
+        self._app = None
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._detected = 0
+        self._skipped = 0
+
+    def load(self) -> None:
+        with self._load_lock:
+            if self._app is not None:
+                return
+            # Only detection and recognition are used; skipping the landmark and gender/age models saves load and run time.
+            app = FaceAnalysis(
+                name=self.model_name,
+                providers=self.providers,
+                allowed_modules=["detection", "recognition"],
             )
-        return results
+            if self.inference is not None and not self.use_gpu:
+                self._limit_threads(app, self.inference.threads_for("face"))
+            app.prepare(ctx_id=0 if self.use_gpu else -1, det_size=(640, 640))
+            self._app = app
 
-    def get_embedding(self, image_bgr: np.ndarray) -> tuple[np.ndarray | None, dict[str, Any]]:
-        faces = self._app.get(image_bgr)
-        if not faces:
+    def is_ready(self) -> bool:
+        return self._app is not None
+
+    def _limit_threads(self, app, threads: int) -> None:
+        # insightface does not forward session options, so rebuild each session from its model file with the budget.
+        for model in app.models.values():
+            path = getattr(model, "model_file", None)
+            if path is None or getattr(model, "session", None) is None:
+                continue
+            model.session = ort.InferenceSession(path, sess_options=onnx_session_options(threads), providers=self.providers)
+
+    def _run(self, fn, *args):
+        if self._app is None:
+            raise RuntimeError("face model is not loaded")
+        if self.inference is None:
+            return fn(*args)
+        return self.inference.run("face", fn, *args)
+
+    def _detect(self, image_bgr: np.ndarray) -> tuple[np.ndarray, np.ndarray | None, np.ndarray]:
+        bboxes, kpss = self._app.det_model.detect(image_bgr, max_num=0, metric="default")
+        quality = face_quality(image_bgr, bboxes, kpss, self.min_size)
+        return bboxes, kpss, quality
+
+    def _embed(self, image_bgr: np.ndarray, kpss: np.ndarray) -> np.ndarray:
+        # Aligned crops for every kept face go through the recognition model as one batch.
+        rec = self._app.models["recognition"]
+        crops = [face_align.norm_crop(image_bgr, landmark=kps, image_size=rec.input_size[0]) for kps in kpss]
+        return rec.get_feat(crops)
+
+    def _analyze(self, image_bgr: np.ndarray, min_quality: float) -> list[dict[str, Any]]:
+        bboxes, kpss, quality = self._detect(image_bgr)
+        keep = np.flatnonzero(quality >= min_quality) if kpss is not None else np.empty(0, dtype=int)
+        self._record(len(bboxes), len(keep))
+        if keep.size == 0:
+            return []
+        embeddings = self._embed(image_bgr, kpss[keep])
+        return [
+            {
+                "bbox": [float(v) for v in bboxes[i, :4]],
+                "embedding": embedding,
+                "quality": round(float(quality[i]), 3),
+            }
+            for i, embedding in zip(keep, embeddings)
+        ]
+
+    def _record(self, detected: int, kept: int) -> None:
+        with self._stats_lock:
+            self._detected += detected
+            self._skipped += detected - kept
+
+    def get_quality_stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            detected = self._detected
+            skipped = self._skipped
+        return {
+            "threshold": self.min_quality,
+            "detected": detected,
+            "skipped": skipped,
+            "skipped_rate": round(skipped / detected, 4) if detected else 0.0,
+        }
+
+    def get_faces(self, image_bgr: np.ndarray, min_quality: float | None = None) -> list[dict[str, Any]]:
+        threshold = self.min_quality if min_quality is None else float(min_quality)
+        with stage("face_analyze"):
+            return self._run(self._analyze, image_bgr, threshold)
+
+    def _embed_largest(self, image_bgr: np.ndarray) -> tuple[np.ndarray | None, dict[str, Any]]:
+        bboxes, kpss, quality = self._detect(image_bgr)
+        if len(bboxes) == 0 or kpss is None:
             return None, {"error": "no_face"}
-        face = max(
-            faces,
-            key=lambda f: (float(f.bbox[2]) - float(f.bbox[0]))
-            * (float(f.bbox[3]) - float(f.bbox[1])),
-        )
-        return face.embedding, {"bbox": [float(v) for v in face.bbox], "faces": len(faces)}
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+        i = int(np.argmax(areas))
+        meta = {"bbox": [float(v) for v in bboxes[i, :4]], "faces": len(bboxes), "quality": round(float(quality[i]), 3)}
+        if quality[i] < self.min_quality:
+            self._record(1, 0)
+            return None, {**meta, "error": "low_quality"}
+        self._record(1, 1)
+        return self._embed(image_bgr, kpss[i : i + 1])[0], meta
+
+    def get_embedding(self, image_bgr: np.ndarray) -> tuple[np.ndarray | None, dict[str, Any]]:
+        with stage("face_analyze"):
+            return self._run(self._embed_largest, image_bgr)
+
+
+def face_quality(image_bgr: np.ndarray, bboxes: np.ndarray, kpss: np.ndarray | None, min_size: int) -> np.ndarray:
+    # Each factor is in [0, 1]: detector confidence, face size, sharpness and how frontal the pose is.
+    if len(bboxes) == 0:
+        return np.zeros(0, dtype=np.float32)
+    height, width = image_bgr.shape[:2]
+    x1 = np.clip(bboxes[:, 0], 0, width - 1).astype(int)
+    y1 = np.clip(bboxes[:, 1], 0, height - 1).astype(int)
+    x2 = np.clip(bboxes[:, 2], 1, width).astype(int)
+    y2 = np.clip(bboxes[:, 3], 1, height).astype(int)
+    x2 = np.maximum(x2, x1 + 1)
+    y2 = np.maximum(y2, y1 + 1)
+
+    det = np.clip((bboxes[:, 4] - 0.5) / 0.3, 0.0, 1.0)
+    size = np.clip(np.minimum(x2 - x1, y2 - y1) / float(max(1, min_size)), 0.0, 1.0)
+
+    # Laplacian variance inside every box at once, via integral images of the response and its square.
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    lap = cv2.Laplacian(gray, cv2.CV_32F)
+    total, squares = cv2.integral2(lap)
+    area = (x2 - x1) * (y2 - y1)
+    s1 = total[y2, x2] - total[y1, x2] - total[y2, x1] + total[y1, x1]
+    s2 = squares[y2, x2] - squares[y1, x2] - squares[y2, x1] + squares[y1, x1]
+    variance = s2 / area - (s1 / area) ** 2
+    blur = np.clip(variance / _BLUR_REFERENCE, 0.0, 1.0)
+
+    if kpss is None:
+        pose = np.ones(len(bboxes))
+    else:
+        # Nose offset from the eye midpoint along the eye line: ~0 frontal, ~0.5 in profile.
+        left_eye, right_eye, nose = kpss[:, 0], kpss[:, 1], kpss[:, 2]
+        eye_vec = right_eye - left_eye
+        eye_dist = np.linalg.norm(eye_vec, axis=1) + 1e-6
+        offset = np.abs(np.sum((nose - (left_eye + right_eye) / 2) * eye_vec, axis=1)) / eye_dist**2
+        pose = np.clip(1.0 - offset / _MAX_YAW_OFFSET, 0.0, 1.0)
+
+    # Geometric mean, so any single failing factor (e.g. a full profile) sinks the score.
+    return (det * size * blur * pose) ** 0.25
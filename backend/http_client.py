@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class EndpointBusyError(requests.RequestException):
+    pass
+
+
+class DeadlineExceededError(requests.Timeout):
+    pass
+
+
+def _abort(resp: requests.Response) -> None:
+    # Shutting the socket down wakes a read blocked in another thread; closing it alone would not.
+    sock = getattr(getattr(resp.raw, "connection", None), "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _Endpoint:
+    def __init__(self, concurrency: int) -> None:
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.calls = 0
+        self.rejected = 0
+
+
+class InferenceClient:
+    def __init__(
+        self,
+        pool_size: int,
+        concurrency: int,
+        timeout_s: float,
+        failure_threshold: int,
+        reset_s: float,
+    ) -> None:
+        self.concurrency = max(1, int(concurrency))
+        self.timeout_s = max(0.5, float(timeout_s))
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_s = max(1.0, float(reset_s))
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(1, int(pool_size)), pool_maxsize=max(1, int(pool_size)))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        # requests' timeout bounds each socket read, not the whole call, so calls run here and the caller
+        # stops waiting at the deadline even if the server keeps dripping bytes.
+        self._calls = ThreadPoolExecutor(max_workers=max(1, int(pool_size)), thread_name_prefix="http-client")
+        self._endpoints: dict[str, _Endpoint] = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, url: str) -> tuple[str, _Endpoint]:
+        parts = urlsplit(url)
+        key = f"{parts.netloc}{parts.path}"
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = _Endpoint(self.concurrency)
+                self._endpoints[key] = endpoint
+        return key, endpoint
+
+    def _allow(self, endpoint: _Endpoint) -> bool:
+        with endpoint.lock:
+            if endpoint.state == "closed":
+                return True
+            if endpoint.state == "open" and time.monotonic() - endpoint.opened_at >= self.reset_s:
+                endpoint.state = "half_open"
+            # Half-open lets a single probe through; everyone else fails fast until it returns.
+            if endpoint.state == "half_open" and not endpoint.probing:
+                endpoint.probing = True
+                return True
+            endpoint.rejected += 1
+            return False
+
+    def _record(self, endpoint: _Endpoint, ok: bool) -> None:
+        with endpoint.lock:
+            endpoint.probing = False
+            if ok:
+                endpoint.state = "closed"
+                endpoint.failures = 0
+                return
+            endpoint.failures += 1
+            if endpoint.state == "half_open" or endpoint.failures >= self.failure_threshold:
+                endpoint.state = "open"
+                endpoint.opened_at = time.monotonic()
+
+    def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: dict[str, str] | None = None,
+        deadline_s: float | None = None,
+    ) -> requests.Response:
+        deadline = time.monotonic() + (deadline_s if deadline_s is not None else self.timeout_s)
+        _, endpoint = self._endpoint(url)
+        if not self._allow(endpoint):
+            raise CircuitOpenError(f"circuit open for {url}")
+
+        # Waiting for a slot counts against the same deadline as the request itself.
+        if not endpoint.semaphore.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._record_skip(endpoint)
+            raise EndpointBusyError(f"no free slot for {url}")
+        release = True
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._record_skip(endpoint)
+                raise EndpointBusyError(f"deadline exceeded before calling {url}")
+            with endpoint.lock:
+                endpoint.calls += 1
+            started: list[requests.Response] = []
+            future = self._calls.submit(self._send, url, headers, data, remaining, started)
+            try:
+                resp = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # The abandoned call keeps its slot until it ends, so concurrency stays bounded; cutting its socket
+                # ends it now instead of after the server finishes dripping.
+                release = False
+                future.add_done_callback(lambda _: endpoint.semaphore.release())
+                for response in started:
+                    _abort(response)
+                self._record(endpoint, ok=False)
+                raise DeadlineExceededError(f"deadline exceeded calling {url}") from None
+            except requests.RequestException:
+                self._record(endpoint, ok=False)
+                raise
+            self._record(endpoint, ok=resp.status_code < 500 and resp.status_code != 429)
+            return resp
+        finally:
+            if release:
+                endpoint.semaphore.release()
+
+    def _send(
+        self,
+        url: str,
+        headers: dict[str, str] | None,
+        data: bytes,
+        remaining: float,
+        started: list[requests.Response],
+    ) -> requests.Response:
+        # Streamed so the response is reachable (and abortable) while its body is still being read.
+        resp = self._session.post(
+            url,
+            headers=headers,
+            data=data,
+            timeout=(min(remaining, 5.0), remaining),
+            stream=True,
+        )
+        started.append(resp)
+        resp.content  # reads the whole body
+        return resp
+
+    def _record_skip(self, endpoint: _Endpoint) -> None:
+        with endpoint.lock:
+            endpoint.probing = False
+            endpoint.rejected += 1
+
+    def close(self) -> None:
+        self._calls.shutdown(wait=False)
+        self._session.close()
+
+    def get_status(self) -> dict[str, Any]:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        status = {}
+        for key, endpoint in endpoints.items():
+            with endpoint.lock:
+                status[key] = {
+                    "state": endpoint.state,
+                    "failures": endpoint.failures,
+                    "calls": endpoint.calls,
+                    "rejected": endpoint.rejected,
+                }
+        return status
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass
+class ModelPolicy:
+    priority: int
+    threads: int
+    min_interval_s: float = 0.0
+    reserved: bool = False
+    backend: str = "torch"
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        calls = max(1, self.calls)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wait_avg_ms": round(self.wait_total / calls * 1000, 2),
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+            "run_avg_ms": round(self.run_total / calls * 1000, 2),
+            "run_max_ms": round(self.run_max * 1000, 2),
+        }
+
+
+class InferenceScheduler:
+    def __init__(self, total_threads: int, policies: dict[str, ModelPolicy]) -> None:
+        self.total_threads = max(1, int(total_threads))
+        self.policies = dict(policies)
+        # Reserved models (the detector) always have their threads held back from everyone else.
+        self._reserved = sum(p.threads for p in self.policies.values() if p.reserved)
+        self._shared = max(1, self.total_threads - self._reserved)
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        self._shared_in_use = 0
+        self._last_start: dict[str, float] = {}
+        self._stats: dict[str, _Stats] = {name: _Stats() for name in self.policies}
+
+    def threads_for(self, name: str) -> int:
+        policy = self.policies.get(name)
+        return policy.threads if policy else 1
+
+    def _rate_ok(self, name: str, now: float) -> bool:
+        return now - self._last_start.get(name, 0.0) >= self.policies[name].min_interval_s
+
+    def _can_start(self, ticket: tuple[int, int, str], now: float) -> bool:
+        name = ticket[2]
+        policy = self.policies[name]
+        if not self._rate_ok(name, now):
+            return False
+        if policy.reserved:
+            return True
+        # Shared threads go to the highest-priority shared model that is allowed to run now.
+        first = min(
+            (t for t in self._waiting if not self.policies[t[2]].reserved and self._rate_ok(t[2], now)),
+            default=ticket,
+        )
+        if first != ticket:
+            return False
+        return self._shared_in_use + min(policy.threads, self._shared) <= self._shared
+
+    def _wait_time(self, name: str, now: float) -> float | None:
+        policy = self.policies[name]
+        remaining = policy.min_interval_s - (now - self._last_start.get(name, 0.0))
+        return remaining if remaining > 0 else None
+
+    def run(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        policy = self.policies.get(name)
+        if policy is None:
+            return fn(*args, **kwargs)
+
+        queued = time.perf_counter()
+        ticket = (policy.priority, next(self._seq), name)
+        threads = min(policy.threads, self._shared)
+        with self._cond:
+            self._waiting.append(ticket)
+            while not self._can_start(ticket, time.monotonic()):
+                self._cond.wait(timeout=self._wait_time(name, time.monotonic()))
+            self._waiting.remove(ticket)
+            self._last_start[name] = time.monotonic()
+            if not policy.reserved:
+                self._shared_in_use += threads
+            self._cond.notify_all()
+
+        # torch's thread count follows the calling thread's OpenMP setting, and every model runs on its own
+        # service thread, so setting it per call keeps each torch model within its own budget.
+        if policy.backend == "torch":
+            _set_torch_threads(policy.threads if policy.reserved else threads)
+
+        started = time.perf_counter()
+        error = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            finished = time.perf_counter()
+            with self._cond:
+                if not policy.reserved:
+                    self._shared_in_use -= threads
+                stats = self._stats[name]
+                stats.calls += 1
+                stats.errors += int(error)
+                stats.wait_total += started - queued
+                stats.wait_max = max(stats.wait_max, started - queued)
+                stats.run_total += finished - started
+                stats.run_max = max(stats.run_max, finished - started)
+                self._cond.notify_all()
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._cond:
+            models = {name: stats.as_dict() for name, stats in self._stats.items()}
+            queued = len(self._waiting)
+            in_use = self._shared_in_use
+        return {
+            "total_threads": self.total_threads,
+            "reserved_threads": self._reserved,
+            "shared_threads_in_use": in_use,
+            "queued": queued,
+            "models": models,
+        }
+
+
+def _set_torch_threads(threads: int) -> None:
+    try:
+        import torch
+    except Exception:
+        return
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+
+
+def onnx_session_options(threads: int):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = max(1, int(threads))
+    options.inter_op_num_threads = 1
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    return options
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import hmac
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile, Response
+from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import cv2
 import numpy as np
 import requests
@@ -14,10 +18,22 @@ from config import load_settings
 from detector import Detector
 from face_db import FaceDB
 from face_service import FaceService
+from http_client import CircuitOpenError, InferenceClient
+from inference import InferenceScheduler, ModelPolicy
+from memory import MemoryWatchdog
+from metrics import REGISTRY, RequestTimingMiddleware
+from profiling import Profiler, ProfilerBusyError, collapsed, top_allocations, top_functions
+from emotion_model import LocalEmotionModel
+from enrollment import BulkEnroller, EnrollmentLimitError
+from executors import EndpointLimiter, LoopLagMonitor, OverloadedError
 from action_service import ActionService
 from audio_alert_service import AudioAlertService
+from recorder import ClipRecorder
 from scheduler import CaptureService, FaceRecognitionService, EmotionService, ActionTrackingService
+from startup import StartupLoader
 from streamer import mjpeg_generator
+from tracing import get_latency_stats
+from upload_queue import UploadQueue
 from uploader import SupabaseUploader
 from utils import ensure_dir, setup_logging
 
@@ -35,22 +51,28 @@ async def lifespan(app: FastAPI):
     except RuntimeError as exc:
         logger.error("Camera failed to open: %s", exc)
         raise
-    detector.start(camera.read)
-    capture_service.start()
-    face_recognition_service.start()
-    emotion_service.start()
-    action_tracking_service.start()
-    audio_alert_service.start()
+    # Models load concurrently in the background; each service starts as soon as its model is ready.
+    startup.start()
+    loop_lag.start()
+    memory_watchdog.start()
     try:
         yield
     finally:
+        await loop_lag.stop()
+        memory_watchdog.stop()
+        startup.stop()
         audio_alert_service.stop()
         action_tracking_service.stop()
+        action_service.stop()
         emotion_service.stop()
         face_recognition_service.stop()
         capture_service.stop()
+        upload_queue.stop()
+        http_client.close()
+        clip_recorder.stop()
         detector.stop()
         camera.close()
+        endpoint_pool.shutdown(wait=False, cancel_futures=True)
 
 
 app = FastAPI(title="Vision V1", version="1.0", lifespan=lifespan)
@@ -61,23 +83,105 @@ app.add_middleware(
     allow_methods=["*"] ,
     allow_headers=["*"] ,
 )
+app.add_middleware(RequestTimingMiddleware)
 
 camera = Camera(index=settings.camera_index)
 
-detector = Detector(model_path=settings.model_path, use_gpu=settings.use_gpu)
+# Blocking endpoint work (decoding, face models, remote calls, disk writes) runs here, off the event loop.
+endpoint_pool = ThreadPoolExecutor(max_workers=max(1, settings.endpoint_workers), thread_name_prefix="endpoint")
+limiters = {
+    name: EndpointLimiter(endpoint_pool, name, concurrency, settings.endpoint_queue_size)
+    for name, concurrency in (
+        ("face_register", settings.endpoint_concurrency),
+        ("face_recognize", settings.endpoint_concurrency),
+        ("face_enroll", 1),
+        ("emotion", settings.endpoint_concurrency),
+        ("capture", settings.endpoint_concurrency),
+    )
+}
+profiler = Profiler(max_seconds=settings.profile_max_seconds, interval_ms=settings.profile_interval_ms)
+loop_lag = LoopLagMonitor(interval_s=settings.loop_lag_interval_s)
+
+inference = InferenceScheduler(
+    total_threads=settings.inference_threads,
+    policies={
+        "detector": ModelPolicy(priority=0, threads=settings.detector_threads, reserved=True),
+        "face": ModelPolicy(priority=1, threads=settings.face_threads, backend="onnx"),
+        "audio": ModelPolicy(priority=2, threads=settings.audio_threads),
+        "emotion": ModelPolicy(priority=3, threads=settings.emotion_threads, backend="onnx"),
+        "action": ModelPolicy(
+            priority=4,
+            threads=settings.action_threads,
+            min_interval_s=settings.action_min_interval_s,
+        ),
+    },
+)
+
+detector = Detector(
+    model_path=settings.model_path,
+    use_gpu=settings.use_gpu,
+    inference=inference,
+    person_left_s=settings.person_left_s,
+)
 
 uploader = SupabaseUploader(settings.supabase_url, settings.supabase_key)
+upload_queue = UploadQueue(
+    uploader=uploader,
+    path=settings.upload_queue_path,
+    workers=settings.upload_workers,
+    max_attempts=settings.upload_max_attempts,
+    backoff_max_s=settings.upload_backoff_max_s,
+)
 
 face_db = FaceDB(settings.face_db_path)
-face_service = FaceService(model_name=settings.face_model_name, use_gpu=settings.use_gpu)
+http_client = InferenceClient(
+    pool_size=settings.http_pool_size,
+    concurrency=settings.http_endpoint_concurrency,
+    timeout_s=settings.http_timeout_s,
+    failure_threshold=settings.circuit_failure_threshold,
+    reset_s=settings.circuit_reset_s,
+)
+face_service = FaceService(
+    model_name=settings.face_model_name,
+    use_gpu=settings.use_gpu,
+    inference=inference,
+    min_quality=settings.face_quality_threshold,
+    min_size=settings.face_min_size,
+)
+face_enroller = BulkEnroller(
+    face_service=face_service,
+    face_db=face_db,
+    workers=settings.enroll_workers,
+    max_images=settings.enroll_max_images,
+    max_mb=settings.enroll_max_mb,
+)
+
+clip_recorder = ClipRecorder(
+    detector=detector,
+    face_db=face_db,
+    clip_dir=settings.clip_dir,
+    pre_s=settings.clip_pre_s,
+    post_s=settings.clip_post_s,
+    fps=settings.clip_fps,
+    segment_s=settings.clip_segment_s,
+    max_buffer_mb=settings.clip_max_buffer_mb,
+    jpeg_quality=settings.clip_jpeg_quality,
+    triggers=settings.clip_triggers,
+)
 
 capture_service = CaptureService(
     detector=detector,
-    uploader=uploader,
+    upload_queue=upload_queue,
+    face_db=face_db,
     interval_s=settings.image_capture_interval,
     cooldown_s=settings.upload_cooldown_seconds,
     capture_dir=settings.capture_dir,
+    dedup_distance=settings.capture_dedup_distance,
+    dedup_history=settings.capture_dedup_history,
+    thumbnail_width=settings.capture_thumbnail_width,
+    event_min_interval_s=settings.capture_event_min_interval_s,
 )
+upload_queue.add_listener(face_db.update_capture_upload)
 
 face_recognition_service = FaceRecognitionService(
     detector=detector,
@@ -87,6 +191,10 @@ face_recognition_service = FaceRecognitionService(
     unknown_threshold=settings.face_unknown_threshold,
     interval_s=settings.face_recognition_interval,
     security_unknown_seconds=settings.security_unknown_seconds,
+    tracked_ids=settings.face_tracked_ids,
+    track_ttl_s=settings.face_track_ttl_s,
+    max_auto_samples=settings.face_max_auto_samples,
+    event_min_interval_s=settings.face_event_min_interval_s,
 )
 
 emotion_service = EmotionService(
@@ -95,6 +203,14 @@ emotion_service = EmotionService(
     hf_token=settings.hf_token,
     interval_s=settings.face_recognition_interval,
     threshold=settings.emotion_conf_threshold,
+    http_client=http_client,
+    face_service=face_service,
+    face_recognition_service=face_recognition_service,
+    cache_ttl_s=settings.emotion_cache_ttl_s,
+    cache_similarity=settings.emotion_cache_similarity,
+    cache_hash_distance=settings.emotion_cache_hash_distance,
+    cache_size=settings.emotion_cache_size,
+    event_min_interval_s=settings.emotion_event_min_interval_s,
 )
 
 action_service = ActionService(
@@ -103,6 +219,8 @@ action_service = ActionService(
     window_s=settings.action_window_s,
     frames=settings.action_frames,
     use_gpu=settings.use_gpu,
+    max_people=settings.action_max_people,
+    inference=inference,
 )
 
 action_tracking_service = ActionTrackingService(
@@ -111,20 +229,186 @@ action_tracking_service = ActionTrackingService(
     face_db=face_db,
     interval_s=settings.action_interval,
     threshold=settings.action_conf_threshold,
+    face_recognition_service=face_recognition_service,
+    event_min_interval_s=settings.action_event_min_interval_s,
 )
 
 audio_alert_service = AudioAlertService(
     face_db=face_db,
+    http_client=http_client,
     hf_url=settings.hf_audio_url,
     hf_token=settings.hf_token,
     labels=settings.audio_labels,
     threshold=settings.audio_threshold,
-    interval_s=settings.audio_interval,
+    hop_s=settings.audio_hop_s,
     window_s=settings.audio_window_s,
     sample_rate=settings.audio_sample_rate,
     device=settings.audio_device,
     local_model=settings.audio_local_model,
+    inference=inference,
+    gate_db=settings.audio_gate_db,
+    max_batch=settings.audio_max_batch,
+)
+
+
+def _start_detector() -> None:
+    detector.start(camera.read)
+    clip_recorder.start()
+    capture_service.start()
+
+
+def _load_emotion_model() -> None:
+    if not settings.emotion_local_model:
+        return
+    try:
+        emotion_service.local_model = LocalEmotionModel(
+            model_path=settings.emotion_local_model,
+            labels=settings.emotion_local_labels,
+            input_size=settings.emotion_input_size,
+            inference=inference,
+        )
+    except Exception as exc:
+        logger.error("Local emotion model failed to load, using remote endpoint: %s", exc)
+
+
+def _load_audio_model() -> None:
+    # A failed local load still starts the service: remote classification keeps working and load_local retries.
+    audio_alert_service.load_local()
+
+
+def _audio_degraded() -> str | None:
+    error = audio_alert_service.get_stats()["local_error"]
+    return f"local audio model {settings.audio_local_model}: {error}" if error else None
+
+
+def _start_action() -> None:
+    action_service.start()
+    action_tracking_service.start()
+
+
+startup = StartupLoader()
+startup.add("detector", detector.load, on_ready=_start_detector)
+startup.add("uploader", uploader.load, on_ready=upload_queue.start)
+startup.add("face", face_service.load, on_ready=face_recognition_service.start)
+# Emotion waits for the face model so it can start with local inference instead of remote-only.
+startup.add("emotion", _load_emotion_model, on_ready=emotion_service.start, after=("face",))
+startup.add("action", action_service.load, on_ready=_start_action)
+startup.add("audio", _load_audio_model, on_ready=audio_alert_service.start, degraded=_audio_degraded)
+
+
+def _budget(value: float) -> int | None:
+    return int(value) if value > 0 else None
+
+
+memory_watchdog = MemoryWatchdog(
+    interval_s=settings.memory_check_interval_s,
+    rss_budget_mb=settings.memory_rss_budget_mb,
+    growth_budget_mb_per_h=settings.memory_growth_budget_mb_per_h,
+)
+# Capped structures use their cap as the budget, so passing it means the cap is not holding.
+memory_watchdog.add_probe(
+    "recognized_ids",
+    lambda: face_recognition_service.get_tracking_sizes()["recognized_ids"],
+    budget=_budget(settings.face_tracked_ids),
+)
+memory_watchdog.add_probe(
+    "unknowns_tracked",
+    lambda: face_recognition_service.get_tracking_sizes()["unknowns_tracked"],
+    budget=_budget(settings.memory_unknowns_tracked_budget),
 )
+memory_watchdog.add_probe(
+    "emotion_cache", lambda: emotion_service.get_cache_stats()["size"], budget=_budget(settings.emotion_cache_size)
+)
+memory_watchdog.add_probe(
+    "clip_buffer_bytes",
+    lambda: clip_recorder.get_status()["buffered_bytes"],
+    budget=_budget(settings.clip_max_buffer_mb * 1024 * 1024),
+)
+_table_budgets = {
+    "faces": settings.memory_faces_budget,
+    "face_samples": settings.memory_face_samples_budget,
+    "unknown_faces": settings.memory_unknown_faces_budget,
+    "events": settings.memory_events_budget,
+    "captures": settings.memory_captures_budget,
+}
+for _table, _rows in _table_budgets.items():
+    memory_watchdog.add_probe(f"db_{_table}", lambda table=_table: face_db.count_rows(table), budget=_budget(_rows))
+memory_watchdog.add_task(face_recognition_service.expire_tracking)
+memory_watchdog.add_task(lambda: face_db.prune_unknowns(settings.unknown_retention_days))
+
+
+def _service_samples():
+    memory = memory_watchdog.get_stats()
+    yield ("vision_memory_rss_bytes", "gauge", "Resident memory at the last watchdog check.", {}, memory["rss_bytes"])
+    yield ("vision_memory_growth_mb_per_hour", "gauge", "RSS growth across the watchdog window.", {}, memory["growth_mb_per_h"])
+    yield ("vision_memory_over_budget", "gauge", "1 when RSS, its growth or a structure is over budget.", {}, int(memory["over_budget"]))
+    yield ("vision_memory_warnings_total", "counter", "Memory budget warnings logged.", {}, memory["warnings"])
+    for name, structure in memory["structures"].items():
+        yield ("vision_structure_size", "gauge", "Size of internal structures and tables.", {"structure": name}, structure["size"])
+
+    for topic, total in detector.bus.get_stats()["published"].items():
+        yield ("vision_events_published_total", "counter", "Detector events published, per topic.", {"topic": topic}, total)
+
+    detector_stats = detector.get_stats()
+    yield ("vision_detector_fps", "gauge", "Detector frames per second.", {}, detector_stats["fps"])
+    yield ("vision_detector_frames_total", "counter", "Frames processed by the detector.", {}, detector_stats["frames"])
+    yield ("vision_frame_age_seconds", "gauge", "Age of the latest processed frame.", {}, detector_stats["frame_age_s"])
+
+    dedup = capture_service.get_dedup_stats()
+    yield ("vision_capture_candidates_total", "counter", "Automatic capture candidates.", {}, dedup["candidates"])
+    yield ("vision_capture_skipped_total", "counter", "Automatic captures skipped as duplicates.", {}, dedup["skipped"])
+
+    quality = face_service.get_quality_stats()
+    yield ("vision_faces_detected_total", "counter", "Faces detected before the quality gate.", {}, quality["detected"])
+    yield ("vision_faces_skipped_total", "counter", "Faces dropped by the quality gate.", {}, quality["skipped"])
+
+    cache = emotion_service.get_cache_stats()
+    yield ("vision_emotion_cache_hits_total", "counter", "Emotion cache hits.", {}, cache["hits"])
+    yield ("vision_emotion_cache_misses_total", "counter", "Emotion cache misses.", {}, cache["misses"])
+    yield ("vision_emotion_faces_reused_total", "counter", "Emotion passes that reused face recognition's faces.", {}, cache["faces_reused"])
+
+    audio = audio_alert_service.get_stats()
+    yield ("vision_audio_windows_total", "counter", "Audio windows considered.", {}, audio["windows"])
+    yield ("vision_audio_gated_total", "counter", "Audio windows skipped by the loudness gate.", {}, audio["gated"])
+    yield ("vision_audio_dropped_hops_total", "counter", "Audio hops skipped because classification fell behind.", {}, audio["dropped_hops"])
+
+    recorder = clip_recorder.get_status()
+    yield ("vision_clip_pending", "gauge", "Clips waiting for post-event frames.", {}, recorder["pending"])
+    yield ("vision_clip_dropped_total", "counter", "Clip triggers dropped.", {}, recorder["dropped"])
+    yield ("vision_clip_buffer_bytes", "gauge", "Bytes held in the clip pre-roll buffer.", {}, recorder["buffered_bytes"])
+
+    for status, total in upload_queue.get_stats().items():
+        yield ("vision_upload_jobs", "gauge", "Upload jobs by status.", {"status": status}, total)
+
+    scheduler_stats = inference.get_stats()
+    yield ("vision_inference_queued", "gauge", "Inference calls waiting for threads.", {}, scheduler_stats["queued"])
+    for model, stats in scheduler_stats["models"].items():
+        yield ("vision_inference_calls_total", "counter", "Inference calls per model.", {"model": model}, stats["calls"])
+        yield ("vision_inference_errors_total", "counter", "Failed inference calls per model.", {"model": model}, stats["errors"])
+
+    for name, limiter in limiters.items():
+        stats = limiter.get_stats()
+        yield ("vision_endpoint_running", "gauge", "Offloaded requests running.", {"endpoint": name}, stats["running"])
+        yield ("vision_endpoint_queued", "gauge", "Offloaded requests waiting.", {"endpoint": name}, stats["queued"])
+        yield ("vision_endpoint_shed_total", "counter", "Requests rejected with 503.", {"endpoint": name}, stats["shed"])
+
+    lag = loop_lag.get_stats()
+    yield ("vision_event_loop_lag_seconds", "gauge", "Last measured event loop lag.", {}, lag["last_ms"] / 1000)
+    yield ("vision_event_loop_lag_max_seconds", "gauge", "Largest event loop lag seen.", {}, lag["max_ms"] / 1000)
+
+    for endpoint, status in http_client.get_status().items():
+        labels = {"endpoint": endpoint}
+        yield ("vision_remote_calls_total", "counter", "Remote inference calls.", labels, status["calls"])
+        yield ("vision_remote_rejected_total", "counter", "Remote calls rejected by the breaker or concurrency limit.", labels, status["rejected"])
+        yield ("vision_remote_circuit_open", "gauge", "1 when the endpoint's breaker is not closed.", labels, int(status["state"] != "closed"))
+
+
+REGISTRY.add_collector(_service_samples)
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/health")
@@ -134,11 +418,82 @@ async def health() -> JSONResponse:
             "ok": True,
             "camera": camera.is_opened(),
             "model": detector.is_ready(),
+            "startup": startup.get_status(),
             "uploader": uploader.enabled,
+            "uploads": upload_queue.get_stats(),
+            "endpoints": http_client.get_status(),
         }
     )
 
 
+@app.get("/server/stats")
+async def server_stats():
+    return JSONResponse(
+        {
+            "ok": True,
+            "event_loop_lag": loop_lag.get_stats(),
+            "frame_latency": get_latency_stats(),
+            "memory": memory_watchdog.get_stats(),
+            "events": detector.bus.get_stats(),
+            "handlers": {name: limiter.get_stats() for name, limiter in limiters.items()},
+        }
+    )
+
+
+@app.get("/inference/stats")
+async def inference_stats():
+    return JSONResponse({"ok": True, "stats": inference.get_stats()})
+
+
+def _require_admin(token: str | None) -> None:
+    # Debug endpoints stay hidden unless ADMIN_TOKEN is set, and then need it on every call.
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="admin_token_invalid")
+
+
+async def _run_profiler(fn, seconds: float):
+    try:
+        # Runs on its own thread so a long profile does not hold an endpoint worker.
+        return await asyncio.to_thread(fn, seconds)
+    except ProfilerBusyError:
+        raise HTTPException(status_code=409, detail="profile_running")
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = 10.0,
+    format: str = "json",
+    top: int = 30,
+    x_admin_token: str | None = Header(default=None),
+):
+    _require_admin(x_admin_token)
+    result = await _run_profiler(profiler.cpu, seconds)
+    stacks = result.pop("stacks")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(stacks))
+    result["top"] = top_functions(stacks, max(1, top))
+    return JSONResponse({"ok": True, **result})
+
+
+@app.get("/debug/allocations")
+async def debug_allocations(
+    seconds: float = 10.0,
+    format: str = "json",
+    top: int = 30,
+    x_admin_token: str | None = Header(default=None),
+):
+    _require_admin(x_admin_token)
+    result = await _run_profiler(profiler.allocations, seconds)
+    stacks = result.pop("stacks")
+    lines = result.pop("lines")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(stacks))
+    result["top"] = top_allocations(lines, max(1, top))
+    return JSONResponse({"ok": True, **result})
+
+
 @app.get("/video-stream")
 async def video_stream():
     if not camera.is_opened():
@@ -151,20 +506,75 @@ async def video_stream():
 
 @app.get("/detections")
 async def detections():
-    ts, objs = detector.get_latest()
-    return JSONResponse({"timestamp": ts, "objects": objs})
+    ts, objs, trace = detector.get_latest()
+    return JSONResponse({"timestamp": ts, "objects": objs, "trace": trace})
 
 
 @app.post("/capture")
 async def capture():
     if not camera.is_opened():
         raise HTTPException(status_code=503, detail="camera_unavailable")
-    result = capture_service.request_capture(reason="manual")
+    result = await _offload("capture", capture_service.request_capture, "manual")
     if not result.get("ok"):
         return JSONResponse(result, status_code=429 if result.get("error") == "cooldown" else 500)
+    return JSONResponse(result, status_code=202)
+
+
+@app.get("/capture/stats")
+async def capture_stats():
+    return JSONResponse({"ok": True, "dedup": capture_service.get_dedup_stats()})
+
+
+@app.get("/capture/{job_id}")
+async def capture_status(job_id: int):
+    job = upload_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return JSONResponse({"ok": True, "job": job})
+
+
+@app.get("/captures")
+async def captures(
+    limit: int = 50,
+    before_id: int | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    reason: str | None = None,
+):
+    limit = max(1, min(int(limit), 200))
+    items = face_db.list_captures(limit=limit, before_id=before_id, start=start, end=end, reason=reason)
+    for item in items:
+        item["thumbnail_url"] = f"/captures/{item['id']}/thumbnail"
+    next_before_id = items[-1]["id"] if len(items) == limit else None
+    return JSONResponse({"ok": True, "captures": items, "next_before_id": next_before_id})
+
+
+@app.get("/captures/{capture_id}/thumbnail")
+async def capture_thumbnail(capture_id: int):
+    data = face_db.get_capture_thumbnail(capture_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="thumbnail_not_found")
+    return Response(content=data, media_type="image/jpeg")
+
+
+@app.post("/clips/trigger")
+async def clip_trigger():
+    if not camera.is_opened():
+        raise HTTPException(status_code=503, detail="camera_unavailable")
+    result = clip_recorder.trigger(reason="manual")
+    if not result.get("ok"):
+        return JSONResponse(result, status_code=429)
     return JSONResponse(result)
 
 
+@app.get("/clips")
+async def clips(limit: int = 50):
+    limit = max(1, min(int(limit), 200))
+    return JSONResponse(
+        {"ok": True, "clips": face_db.list_clips(limit=limit), "recorder": clip_recorder.get_status()}
+    )
+
+
 def _best_matches(embedding: np.ndarray, threshold: float, top_k: int = 3) -> list[dict]:
     emb = np.asarray(embedding, dtype=np.float32)
     emb_norm = np.linalg.norm(emb) + 1e-10
@@ -193,21 +603,38 @@ def _best_unknown(embedding: np.ndarray, threshold: float) -> tuple[int | None,
     return best_id, best_score
 
 
-async def _load_image(source: str, file: UploadFile | None) -> np.ndarray:
+async def _offload(name: str, fn, *args):
+    try:
+        return await limiters[name].run(fn, *args)
+    except OverloadedError:
+        raise HTTPException(status_code=503, detail="overloaded", headers={"Retry-After": "1"})
+
+
+async def _read_upload(source: str, file: UploadFile | None) -> bytes | None:
+    if source == "live":
+        return None
+    if file is None:
+        raise HTTPException(status_code=400, detail="image_required")
+    return await file.read()
+
+
+def _load_image(source: str, data: bytes | None) -> np.ndarray:
     if source == "live":
         frame = camera.read()
         if frame is None:
             raise HTTPException(status_code=503, detail="camera_unavailable")
         return frame
-    if file is None:
-        raise HTTPException(status_code=400, detail="image_required")
-    data = await file.read()
-    img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    img = cv2.imdecode(np.frombuffer(data or b"", np.uint8), cv2.IMREAD_COLOR)
     if img is None:
         raise HTTPException(status_code=400, detail="invalid_image")
     return img
 
 
+def _require_face_model() -> None:
+    if not face_service.is_ready():
+        raise HTTPException(status_code=503, detail="face_model_loading")
+
+
 def _encode_jpeg(frame: np.ndarray) -> bytes:
     ok, encoded = cv2.imencode(".jpg", frame)
     if not ok:
@@ -228,12 +655,43 @@ async def face_register(
 ):
     if source not in {"upload", "live"}:
         raise HTTPException(status_code=400, detail="invalid_source")
-    img = await _load_image(source, file)
+    _require_face_model()
+    data = await _read_upload(source, file)
+    return JSONResponse(await _offload("face_register", _register_face, name.strip(), source, data))
+
+
+def _register_face(name: str, source: str, data: bytes | None) -> dict:
+    img = _load_image(source, data)
     embedding, meta = face_service.get_embedding(img)
     if embedding is None:
         raise HTTPException(status_code=422, detail=meta.get("error", "no_face"))
-    face_id = face_db.add(name.strip(), embedding)
-    return JSONResponse({"ok": True, "id": face_id, "name": name.strip(), "meta": meta})
+    face_id = face_db.add(name, embedding)
+    return {"ok": True, "id": face_id, "name": name, "meta": meta}
+
+
+@app.post("/face/enroll")
+async def face_enroll(
+    files: list[UploadFile] = File(...),
+    manifest: str | None = Form(None),
+):
+    _require_face_model()
+    mapping: dict[str, str] = {}
+    if manifest:
+        try:
+            mapping = json.loads(manifest)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid_manifest")
+        if not isinstance(mapping, dict):
+            raise HTTPException(status_code=400, detail="invalid_manifest")
+        mapping = {str(key): str(value).strip() for key, value in mapping.items()}
+    uploads = [(file.filename or "", file.file) for file in files]
+    try:
+        result = await _offload("face_enroll", face_enroller.run, uploads, mapping)
+    except EnrollmentLimitError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return JSONResponse(result)
 
 
 @app.post("/face/recognize")
@@ -243,7 +701,13 @@ async def face_recognize(
 ):
     if source not in {"upload", "live"}:
         raise HTTPException(status_code=400, detail="invalid_source")
-    img = await _load_image(source, file)
+    _require_face_model()
+    data = await _read_upload(source, file)
+    return JSONResponse(await _offload("face_recognize", _recognize_faces, source, data))
+
+
+def _recognize_faces(source: str, data: bytes | None) -> dict:
+    img = _load_image(source, data)
     faces = face_service.get_faces(img)
     if not faces:
         raise HTTPException(status_code=422, detail="no_face")
@@ -259,7 +723,7 @@ async def face_recognize(
             if best["score"] > best_score:
                 best_overall = best
                 best_score = best["score"]
-            results.append({"bbox": bbox, "best": best, "matches": matches})
+            results.append({"bbox": bbox, "best": best, "matches": matches, "quality": face.get("quality")})
             continue
 
         unknown_id, unknown_score = _best_unknown(embedding, settings.face_unknown_threshold)
@@ -273,22 +737,22 @@ async def face_recognize(
                 "bbox": bbox,
                 "best": {"id": unknown_id, "name": unknown_name, "score": unknown_score},
                 "matches": [],
+                "quality": face.get("quality"),
             }
         )
-    matches = best_overall
-    return JSONResponse(
-        {
-            "ok": True,
-            "threshold": settings.face_match_threshold,
-            "best": matches,
-            "faces": results,
-        }
-    )
+    return {
+        "ok": True,
+        "threshold": settings.face_match_threshold,
+        "best": best_overall,
+        "faces": results,
+    }
 
 
 @app.get("/face/last")
 async def face_last():
-    return JSONResponse({"ok": True, "result": face_recognition_service.get_last()})
+    return JSONResponse(
+        {"ok": True, "result": face_recognition_service.get_last(), "quality": face_service.get_quality_stats()}
+    )
 
 
 @app.get("/security/last")
@@ -312,7 +776,7 @@ async def security_unknown_frame(unknown_id: int | None = None):
     if not bbox or len(bbox) != 4:
         raise HTTPException(status_code=404, detail="bbox_missing")
 
-    frame = detector.get_latest_frame(annotated=False)
+    frame = detector.get_latest_frame(annotated=False, copy=False)
     if frame is None:
         raise HTTPException(status_code=503, detail="no_frame")
     x1, y1, x2, y2 = [int(v) for v in bbox]
@@ -346,20 +810,31 @@ async def emotion_detect(
     source: str = Form("upload"),
     file: UploadFile | None = File(None),
 ):
-    if not settings.hf_token:
+    if not settings.hf_token and not emotion_service.has_local():
+        if settings.emotion_local_model and not startup.is_ready("emotion"):
+            raise HTTPException(status_code=503, detail="emotion_model_loading")
         raise HTTPException(status_code=500, detail="hf_token_missing")
     if source not in {"upload", "live"}:
         raise HTTPException(status_code=400, detail="invalid_source")
-
-    if source == "live":
-        frame = camera.read()
-        if frame is None:
-            raise HTTPException(status_code=503, detail="camera_unavailable")
-        data = _encode_jpeg(frame)
+    upload = await _read_upload(source, file)
+    return await _offload("emotion", _detect_emotion, source, upload)
+
+
+def _detect_emotion(source: str, upload: bytes | None) -> JSONResponse:
+    if emotion_service.has_local():
+        img = _load_image(source, upload)
+        local = emotion_service.classify_local(img, use_cache=False)
+        if local is not None:
+            if not local.get("ok"):
+                raise HTTPException(status_code=422, detail=local.get("error", "no_face"))
+            return JSONResponse(local)
+        if not settings.hf_token:
+            raise HTTPException(status_code=502, detail="local_emotion_failed")
+        data = _encode_jpeg(img)
+    elif source == "live":
+        data = _encode_jpeg(_load_image(source, None))
     else:
-        if file is None:
-            raise HTTPException(status_code=400, detail="image_required")
-        data = await file.read()
+        data = upload
         if not data:
             raise HTTPException(status_code=400, detail="invalid_image")
 
@@ -368,12 +843,9 @@ async def emotion_detect(
         "Content-Type": "image/jpeg",
     }
     try:
-        resp = requests.post(
-            settings.hf_emotion_url,
-            headers=headers,
-            data=data,
-            timeout=30,
-        )
+        resp = http_client.post(settings.hf_emotion_url, data=data, headers=headers)
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="hf_circuit_open")
     except requests.RequestException:
         raise HTTPException(status_code=502, detail="hf_request_failed")
 
@@ -385,12 +857,14 @@ async def emotion_detect(
     if resp.status_code >= 400:
         logger.warning("HF emotion error %s: %s", resp.status_code, payload)
         return JSONResponse({"ok": False, "error": payload}, status_code=resp.status_code)
-    return JSONResponse({"ok": True, "result": payload})
+    return JSONResponse({"ok": True, "backend": "remote", "result": payload})
 
 
 @app.get("/emotion/last")
 async def emotion_last():
-    return JSONResponse({"ok": True, "result": emotion_service.get_last()})
+    return JSONResponse(
+        {"ok": True, "result": emotion_service.get_last(), "cache": emotion_service.get_cache_stats()}
+    )
 
 
 @app.get("/action/last")
@@ -400,4 +874,6 @@ async def action_last():
 
 @app.get("/audio/last")
 async def audio_last():
-    return JSONResponse({"ok": True, "result": audio_alert_service.get_last()})
+    return JSONResponse(
+        {"ok": True, "result": audio_alert_service.get_last(), "stats": audio_alert_service.get_stats()}
+    )
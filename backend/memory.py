@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable
+
+try:
+    import psutil
+except ImportError:  # /proc is read directly on Linux without it
+    psutil = None
+
+logger = logging.getLogger("vision-v1")
+
+_MB = 1024 * 1024
+_MISSING = object()
+
+
+def rss_bytes() -> int | None:
+    if psutil is not None:
+        return int(psutil.Process().memory_info().rss)
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class BoundedDict:
+    # Least recently written entries go first once max_size is reached; entries not written for ttl_s expire.
+    def __init__(self, max_size: int, ttl_s: float = 0.0) -> None:
+        self.max_size = max(1, int(max_size))
+        self.ttl_s = max(0.0, float(ttl_s))
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        # The owning service writes while the watchdog sweeps and counts.
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            touched, value = item
+            if self.ttl_s and time.monotonic() - touched > self.ttl_s:
+                del self._data[key]
+                self.expired += 1
+                return default
+            return value
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evicted += 1
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def expire(self) -> int:
+        if not self.ttl_s:
+            return 0
+        cutoff = time.monotonic() - self.ttl_s
+        with self._lock:
+            stale = [key for key, (touched, _) in self._data.items() if touched < cutoff]
+            for key in stale:
+                del self._data[key]
+            self.expired += len(stale)
+        return len(stale)
+
+
+class _Probe:
+    def __init__(self, name: str, size: Callable[[], int | None], budget: int | None) -> None:
+        self.name = name
+        self.size = size
+        self.budget = budget
+        self.value: int | None = None
+        self.over = False
+
+
+class MemoryWatchdog:
+    def __init__(
+        self,
+        interval_s: float = 60.0,
+        rss_budget_mb: float = 0.0,
+        growth_budget_mb_per_h: float = 0.0,
+        window: int = 60,
+    ) -> None:
+        self.interval_s = max(1.0, float(interval_s))
+        self.rss_budget = int(float(rss_budget_mb) * _MB) if rss_budget_mb > 0 else None
+        self.growth_budget_mb_per_h = float(growth_budget_mb_per_h) if growth_budget_mb_per_h > 0 else None
+        self._probes: dict[str, _Probe] = {}
+        self._tasks: list[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # (monotonic time, rss) samples; growth is measured across the whole window.
+        self._samples: deque[tuple[float, int]] = deque(maxlen=max(2, int(window)))
+        self._baseline: int | None = None
+        self._peak = 0
+        self._rss_over = False
+        self._growth_over = False
+        self.warnings = 0
+
+    def add_probe(self, name: str, size: Callable[[], int | None], budget: int | None = None) -> None:
+        self._probes[name] = _Probe(name, size, budget)
+
+    def add_task(self, task: Callable[[], Any]) -> None:
+        # Housekeeping (TTL sweeps, table retention) rides on the watchdog's tick instead of its own thread.
+        self._tasks.append(task)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="memory-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval_s)
+
+    def _warn(self, message: str, *args) -> None:
+        self.warnings += 1
+        logger.warning(message, *args)
+
+    def check(self) -> None:
+        for task in self._tasks:
+            try:
+                task()
+            except Exception as exc:
+                logger.warning("Memory watchdog task failed: %s", exc)
+
+        rss = rss_bytes()
+        now = time.monotonic()
+        with self._lock:
+            if rss is not None:
+                if self._baseline is None:
+                    self._baseline = rss
+                self._peak = max(self._peak, rss)
+                self._samples.append((now, rss))
+
+        for probe in self._probes.values():
+            try:
+                value = probe.size()
+            except Exception:
+                value = None
+            over = value is not None and probe.budget is not None and value > probe.budget
+            # Warn on the way over a budget, not on every tick while it stays there.
+            if over and not probe.over:
+                self._warn("Memory watchdog: %s is at %d (budget %d)", probe.name, value, probe.budget)
+            with self._lock:
+                probe.value = value
+                probe.over = over
+
+        if rss is not None and self.rss_budget is not None:
+            over = rss > self.rss_budget
+            if over and not self._rss_over:
+                self._warn("Memory watchdog: RSS %.0f MB is over the %.0f MB budget", rss / _MB, self.rss_budget / _MB)
+            self._rss_over = over
+
+        growth = self._growth_mb_per_h()
+        if growth is not None and self.growth_budget_mb_per_h is not None:
+            over = growth > self.growth_budget_mb_per_h
+            if over and not self._growth_over:
+                self._warn(
+                    "Memory watchdog: RSS growing %.1f MB/h (budget %.1f MB/h)", growth, self.growth_budget_mb_per_h
+                )
+            self._growth_over = over
+
+    def _growth_mb_per_h(self) -> float | None:
+        with self._lock:
+            # Only a full window counts, so model loading right after startup is not reported as growth.
+            if len(self._samples) < self._samples.maxlen:
+                return None
+            (start, first), (end, last) = self._samples[0], self._samples[-1]
+        if end <= start:
+            return None
+        return (last - first) / _MB / ((end - start) / 3600.0)
+
+    def get_stats(self) -> dict[str, Any]:
+        growth = self._growth_mb_per_h()
+        with self._lock:
+            rss = self._samples[-1][1] if self._samples else None
+            structures = {
+                probe.name: {"size": probe.value, "budget": probe.budget, "over_budget": probe.over}
+                for probe in self._probes.values()
+            }
+            return {
+                "rss_bytes": rss,
+                "rss_mb": round(rss / _MB, 1) if rss is not None else None,
+                "peak_rss_mb": round(self._peak / _MB, 1) if self._peak else None,
+                "baseline_rss_mb": round(self._baseline / _MB, 1) if self._baseline is not None else None,
+                "rss_budget_mb": round(self.rss_budget / _MB, 1) if self.rss_budget is not None else None,
+                "growth_mb_per_h": round(growth, 2) if growth is not None else None,
+                "growth_budget_mb_per_h": self.growth_budget_mb_per_h,
+                "over_budget": self._rss_over or self._growth_over or any(p.over for p in self._probes.values()),
+                "warnings": self.warnings,
+                "structures": structures,
+            }
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (metric name, type, help, labels, value) as produced by scrape-time collectors.
+Sample = tuple[str, str, str, dict[str, Any], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[Any, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets=_BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[Any, ...], list[float]] = {}
+
+    def observe(self, value: float, *label_values: Any) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._series[label_values] = series
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = {key: list(value) for key, value in self._series.items()}
+        lines = []
+        for label_values, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts[:-1]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {counts[-1]!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Histogram] = []
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def histogram(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets=_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        # Collector values are read at scrape time, so the hot paths pay nothing for them.
+        grouped: dict[str, tuple[str, str, list[str]]] = {}
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception:
+                continue
+            for name, kind, help_text, labels, value in samples:
+                if value is None:
+                    continue
+                entry = grouped.setdefault(name, (kind, help_text, []))
+                names = tuple(labels)
+                entry[2].append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        for name, (kind, help_text, samples) in grouped.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "vision_stage_seconds",
+    "Time spent in each pipeline stage.",
+    ("stage",),
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "vision_http_request_seconds",
+    "Time until the response starts, per route.",
+    ("method", "route", "status"),
+)
+
+
+def stage(name: str):
+    return STAGE_SECONDS.time(name)
+
+
+class RequestTimingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        recorded = False
+
+        async def _send(message) -> None:
+            nonlocal recorded
+            # Measured to the first response message, so streaming endpoints are not timed for their whole life.
+            if message["type"] == "http.response.start" and not recorded:
+                recorded = True
+                route = scope.get("route")
+                REQUEST_SECONDS.observe(
+                    time.perf_counter() - started,
+                    scope.get("method", ""),
+                    getattr(route, "path", "unmatched"),
+                    str(message.get("status", 0)),
+                )
+            await send(message)
+
+        await self.app(scope, receive, _send)
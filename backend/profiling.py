@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any
+
+# Frames kept per allocation traceback while tracemalloc runs for a diff.
+_TRACE_FRAMES = 25
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> tuple[str, ...]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def _thread_clock(ident: int):
+    # Per-thread CPU clocks make the profile show where CPU went, not which threads were merely waiting.
+    try:
+        clock_id = time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return lambda: time.clock_gettime(clock_id)
+
+
+def collapsed(stacks: Counter) -> str:
+    # One "root;...;leaf value" line per stack, as read by flamegraph.pl, speedscope and inferno.
+    lines = [f"{';'.join(stack)} {int(value)}" for stack, value in stacks.most_common() if value >= 1]
+    return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    def __init__(self, max_seconds: float = 60.0, interval_ms: float = 5.0) -> None:
+        self.max_seconds = max(1.0, float(max_seconds))
+        self.interval_s = max(0.001, float(interval_ms) / 1000.0)
+        # One profile or allocation diff at a time; overlapping runs would skew each other.
+        self._busy = threading.Lock()
+
+    def _acquire(self) -> None:
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusyError("profile_running")
+
+    def _clamp(self, seconds: float) -> float:
+        return min(self.max_seconds, max(0.1, float(seconds)))
+
+    def cpu(self, seconds: float) -> dict[str, Any]:
+        self._acquire()
+        try:
+            return self._sample(self._clamp(seconds))
+        finally:
+            self._busy.release()
+
+    def _sample(self, seconds: float) -> dict[str, Any]:
+        own = threading.get_ident()
+        clocks: dict[int, Any] = {}
+        last_cpu: dict[int, float] = {}
+        stacks: Counter = Counter()
+        per_thread: Counter = Counter()
+        samples = 0
+        mode = "cpu"
+        started = time.perf_counter()
+        deadline = started + seconds
+        last_tick = started
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                if ident not in clocks:
+                    clocks[ident] = _thread_clock(ident)
+                clock = clocks[ident]
+                if clock is None:
+                    # Without thread CPU clocks this degrades to wall-clock sampling.
+                    mode = "wall"
+                    weight = (now - last_tick) * 1_000_000
+                else:
+                    try:
+                        cpu_now = clock()
+                    except OSError:
+                        continue
+                    weight = (cpu_now - last_cpu.get(ident, cpu_now)) * 1_000_000
+                    last_cpu[ident] = cpu_now
+                if weight <= 0:
+                    continue
+                name = names.get(ident, f"thread-{ident}")
+                stacks[(name,) + _stack(frame)] += weight
+                per_thread[name] += weight
+            del frames
+            samples += 1
+            last_tick = now
+            time.sleep(self.interval_s)
+
+        elapsed = time.perf_counter() - started
+        return {
+            "mode": mode,
+            "seconds": round(elapsed, 3),
+            "samples": samples,
+            "unit": "microseconds",
+            "threads": {name: round(value / 1000, 2) for name, value in per_thread.most_common()},
+            "stacks": stacks,
+        }
+
+    def allocations(self, seconds: float) -> dict[str, Any]:
+        self._acquire()
+        try:
+            return self._diff(self._clamp(seconds))
+        finally:
+            self._busy.release()
+
+    def _diff(self, seconds: float) -> dict[str, Any]:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(_TRACE_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started_here:
+                tracemalloc.stop()
+        # Filtered only after both snapshots, so building the filters is not counted as growth.
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        before = before.filter_traces(ignore)
+        after = after.filter_traces(ignore)
+
+        stacks: Counter = Counter()
+        for stat in after.compare_to(before, "traceback"):
+            if stat.size_diff <= 0:
+                continue
+            # Tracebacks run from the oldest frame to the allocating one, the order flame graphs expect.
+            frames = tuple(f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in stat.traceback)
+            stacks[frames] += stat.size_diff
+
+        by_line = after.compare_to(before, "lineno")
+        return {
+            "seconds": seconds,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            # Allocations made before tracing started are invisible, so a fresh run only shows growth during the window.
+            "started_tracing": started_here,
+            "unit": "bytes",
+            "lines": by_line,
+            "stacks": stacks,
+        }
+
+
+def top_functions(stacks: Counter, limit: int) -> list[dict[str, Any]]:
+    self_cost: Counter = Counter()
+    total_cost: Counter = Counter()
+    for stack, value in stacks.items():
+        # The first entry is the thread name; the last is the frame that was running.
+        frames = stack[1:]
+        if not frames:
+            continue
+        self_cost[frames[-1]] += value
+        for frame in set(frames):
+            total_cost[frame] += value
+    return [
+        {"function": frame, "self_ms": round(value / 1000, 2), "total_ms": round(total_cost[frame] / 1000, 2)}
+        for frame, value in self_cost.most_common(limit)
+    ]
+
+
+def top_allocations(lines, limit: int) -> list[dict[str, Any]]:
+    result = []
+    for stat in lines[:limit]:
+        frame = stat.traceback[0]
+        result.append(
+            {
+                "line": f"{frame.filename}:{frame.lineno}",
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+        )
+    return result
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import cv2
+import numpy as np
+
+from utils import dated_path, ensure_dir
+
+logger = logging.getLogger("vision-v1")
+
+
+class ClipRecorder:
+    def __init__(
+        self,
+        detector,
+        face_db,
+        clip_dir: str,
+        pre_s: float,
+        post_s: float,
+        fps: int,
+        segment_s: float,
+        max_buffer_mb: int,
+        jpeg_quality: int,
+        triggers: list[str],
+        max_pending: int = 4,
+    ) -> None:
+        self.detector = detector
+        self.face_db = face_db
+        self.clip_dir = clip_dir
+        self.pre_s = max(0.0, float(pre_s))
+        self.post_s = max(0.0, float(post_s))
+        self.fps = max(1, int(fps))
+        self.segment_s = max(1.0, float(segment_s))
+        self.max_buffer_bytes = max(1, int(max_buffer_mb)) * 1024 * 1024
+        self.jpeg_quality = min(100, max(10, int(jpeg_quality)))
+        self.triggers = {trigger.strip() for trigger in triggers if trigger.strip()}
+        self.max_pending = max(1, int(max_pending))
+
+        # The ring must span pre + post so a clip can be sliced once its post window closes. Entries hold the
+        # shared read-only frame until a pending clip needs them, and only then are they JPEG-encoded.
+        max_frames = int((self.pre_s + self.post_s + 1.0) * self.fps)
+        self._ring: deque[list[Any]] = deque(maxlen=max(1, max_frames))
+        self._ring_bytes = 0
+        self._pending: list[dict[str, Any]] = []
+        self._jobs: queue.Queue[dict[str, Any]] = queue.Queue(maxsize=self.max_pending)
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._writer: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._last_clip: dict[str, Any] | None = None
+        self._dropped = 0
+
+        if self.triggers:
+            self.face_db.add_event_listener(self._on_event)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        ensure_dir(self.clip_dir)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._writer is not None:
+            self._writer.join(timeout=2)
+
+    def trigger(self, reason: str = "manual", event_id: int | None = None) -> dict[str, Any]:
+        now = time.time()
+        item = {"reason": reason, "event_id": event_id, "start": now - self.pre_s, "end": now + self.post_s}
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return {"ok": False, "error": "busy", "reason": reason}
+            self._pending.append(item)
+        if event_id is None:
+            # Manual clips get an event row like triggered ones, so they show up in the event history.
+            _, trace = self.detector.get_frame(annotated=True, copy=False)
+            event_id = self.face_db.add_event(
+                event_type="clip_manual",
+                face_type="manual",
+                face_id=None,
+                name=reason,
+                score=None,
+                bbox=None,
+                trace=trace,
+            )
+            with self._lock:
+                item["event_id"] = event_id
+        return {"ok": True, "reason": reason, "event_id": event_id, "ready_in_s": self.post_s}
+
+    def get_status(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "buffered_frames": len(self._ring),
+                "buffered_bytes": self._ring_bytes,
+                "max_buffer_bytes": self.max_buffer_bytes,
+                "pending": len(self._pending),
+                "dropped": self._dropped,
+                "last_clip": dict(self._last_clip) if self._last_clip else None,
+            }
+
+    def _on_event(self, event_id: int, event_type: str, name: str | None) -> None:
+        if event_type in self.triggers:
+            self.trigger(reason=event_type, event_id=event_id)
+
+    def _push(self, ts: float, frame_id: int, frame: np.ndarray) -> None:
+        with self._lock:
+            if len(self._ring) == self._ring.maxlen:
+                self._ring_bytes -= _size(self._ring[0][2])
+            self._ring.append([ts, frame_id, frame])
+            self._ring_bytes += _size(frame)
+            # With no clip pending only the pre-roll is kept; a pending clip holds frames back to its start.
+            keep_from = min([ts - self.pre_s] + [item["start"] for item in self._pending])
+            while len(self._ring) > 1 and (
+                self._ring[0][0] < keep_from or self._ring_bytes > self.max_buffer_bytes
+            ):
+                self._ring_bytes -= _size(self._ring.popleft()[2])
+
+    def _encode_pending(self, params: list[int]) -> None:
+        # Only frames inside a pending clip's window are encoded, once each, however many clips share them.
+        with self._lock:
+            windows = [(item["start"], item["end"]) for item in self._pending]
+            entries = [
+                entry
+                for entry in self._ring
+                if isinstance(entry[2], np.ndarray) and any(start <= entry[0] <= end for start, end in windows)
+            ]
+        encoded: dict[int, bytes] = {}
+        for entry in entries:
+            frame_id = entry[1]
+            if frame_id not in encoded:
+                ok, data = cv2.imencode(".jpg", entry[2], params)
+                if not ok:
+                    continue
+                encoded[frame_id] = data.tobytes()
+            with self._lock:
+                self._ring_bytes += len(encoded[frame_id]) - _size(entry[2])
+                entry[2] = encoded[frame_id]
+
+    def _collect_due(self, now: float) -> None:
+        with self._lock:
+            due = [item for item in self._pending if item["end"] <= now]
+            if not due:
+                return
+            self._pending = [item for item in self._pending if item["end"] > now]
+            for item in due:
+                item["frames"] = [
+                    (entry[0], entry[2])
+                    for entry in self._ring
+                    if item["start"] <= entry[0] <= item["end"] and isinstance(entry[2], bytes)
+                ]
+        for item in due:
+            try:
+                self._jobs.put_nowait(item)
+            except queue.Full:
+                with self._lock:
+                    self._dropped += 1
+
+    def _loop(self) -> None:
+        delay = 1.0 / self.fps
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        while not self._stop.is_set():
+            frame, trace = self.detector.get_frame(annotated=True, copy=False)
+            if frame is not None and trace is not None:
+                # Stamped with the capture time, so clip bounds line up with the trigger and not with this poll.
+                captured = dt.datetime.fromisoformat(trace["captured_at"]).timestamp()
+                self._push(captured, trace["frame_id"], frame)
+            with self._lock:
+                pending = bool(self._pending)
+            if pending:
+                self._encode_pending(params)
+            self._collect_due(time.time())
+            self._stop.wait(delay)
+
+    def _write_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._write_clip(job)
+            except Exception as exc:
+                logger.warning("Clip write failed for %s: %s", job.get("reason"), exc)
+
+    def _write_clip(self, job: dict[str, Any]) -> None:
+        frames: list[tuple[float, bytes]] = job["frames"]
+        if not frames:
+            return
+        started = dt.datetime.fromtimestamp(frames[0][0], dt.timezone.utc)
+        ended = dt.datetime.fromtimestamp(frames[-1][0], dt.timezone.utc)
+        folder = os.path.join(
+            dated_path(self.clip_dir, started),
+            f"{started.strftime('%Y%m%dT%H%M%SZ')}_{job['reason']}",
+        )
+        ensure_dir(folder)
+
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        segment_start = frames[0][0]
+        segment_index = 0
+        writer = None
+        written = 0
+        try:
+            for ts, data in frames:
+                img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if img is None:
+                    continue
+                if writer is not None and ts - segment_start >= self.segment_s:
+                    writer.release()
+                    writer = None
+                    segment_index += 1
+                    segment_start = ts
+                if writer is None:
+                    path = os.path.join(folder, f"segment_{segment_index:03d}.mp4")
+                    height, width = img.shape[:2]
+                    writer = cv2.VideoWriter(path, fourcc, float(self.fps), (width, height))
+                writer.write(img)
+                written += 1
+        finally:
+            if writer is not None:
+                writer.release()
+
+        clip_id = self.face_db.add_clip(
+            event_id=job.get("event_id"),
+            reason=job["reason"],
+            path=folder,
+            segments=segment_index + 1,
+            frames=written,
+            started_at=started.isoformat(),
+            ended_at=ended.isoformat(),
+        )
+        with self._lock:
+            self._last_clip = {
+                "id": clip_id,
+                "event_id": job.get("event_id"),
+                "reason": job["reason"],
+                "path": folder,
+                "segments": segment_index + 1,
+                "frames": written,
+            }
+
+
+def _size(data: np.ndarray | bytes) -> int:
+    return data.nbytes if isinstance(data, np.ndarray) else len(data)
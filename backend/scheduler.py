@@ -3,37 +3,87 @@ from __future__ import annotations
 import os
 import threading
 import time
+from collections import deque
 from typing import Any
 
 import cv2
 import numpy as np
-import requests
 
+from emotion_model import crop_faces
+from http_client import CircuitOpenError
+from memory import BoundedDict
+from metrics import stage
+from tracing import result_trace
 from uploader import build_storage_path
 from utils import dated_path, ensure_dir, now_utc, timestamp_str
 
 
+# Detector events that mean someone new is in view.
+_PERSON_TOPICS = ("person_appeared", "track_new")
+
+# How long emotion classification waits for face recognition to analyze a newer frame before detecting faces itself.
+_FACE_REUSE_WAIT_S = 2.0
+
+
+def _wait_for_people(detector, events, interval_s: float) -> list[dict[str, Any]]:
+    # With nobody in view this blocks until a person appears, so an empty scene costs nothing. With someone in
+    # view it returns after interval_s, or sooner for a new person, as far as the subscription's rate limit allows.
+    return events.get(timeout=interval_s if detector.person_present() else None)
+
+
+def _dhash(frame: np.ndarray, size: int = 8) -> int:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
 class CaptureService:
-    def __init__(self, detector, uploader, interval_s: int, cooldown_s: int, capture_dir: str) -> None:
+    def __init__(
+        self,
+        detector,
+        upload_queue,
+        face_db,
+        interval_s: int,
+        cooldown_s: int,
+        capture_dir: str,
+        dedup_distance: int = 6,
+        dedup_history: int = 8,
+        thumbnail_width: int = 160,
+        event_min_interval_s: float = 1.0,
+    ) -> None:
         self.detector = detector
-        self.uploader = uploader
+        self.upload_queue = upload_queue
+        self.face_db = face_db
         self.interval_s = max(5, interval_s)
         self.cooldown_s = max(1, cooldown_s)
         self.capture_dir = capture_dir
+        # 0 skips exact hash matches only; a negative distance turns dedup off.
+        self.dedup_distance = max(-1, int(dedup_distance))
+        self.thumbnail_width = max(32, int(thumbnail_width))
+        self.event_min_interval_s = max(0.0, float(event_min_interval_s))
+
+        self._recent: deque[dict[str, Any]] = deque(maxlen=max(1, int(dedup_history)))
+        self._candidates = 0
+        self._skipped = 0
 
         self._last_capture = 0.0
         self._stop = threading.Event()
         self._thread: threading.Thread | None = None
+        self._events = None
         self._lock = threading.Lock()
 
     def start(self) -> None:
         if self._thread is not None:
             return
+        self._events = self.detector.bus.subscribe(_PERSON_TOPICS, min_interval_s=self.event_min_interval_s)
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
         self._stop.set()
+        if self._events is not None:
+            self._events.close()
         if self._thread is not None:
             self._thread.join(timeout=2)
 
@@ -47,7 +97,7 @@ class CaptureService:
         return self._capture(reason=reason)
 
     def _capture(self, reason: str) -> dict[str, Any]:
-        frame = self.detector.get_latest_frame(annotated=True)
+        frame = self.detector.get_latest_frame(annotated=True, copy=False)
         if frame is None:
             return {"ok": False, "error": "no_frame", "reason": reason}
 
@@ -64,28 +114,126 @@ class CaptureService:
         with open(local_path, "wb") as f:
             f.write(encoded.tobytes())
 
-        storage_path = build_storage_path(filename)
-        upload = self.uploader.upload_image(storage_path, encoded.tobytes())
+        _, detections, _ = self.detector.get_latest()
+        labels = sorted({str(det.get("label")) for det in detections if det.get("label")})
+        thumbnail = self._thumbnail(frame)
+
+        if not self.upload_queue.enabled:
+            capture_id = self.face_db.add_capture(
+                path=local_path,
+                storage_path=None,
+                captured_at=ts.isoformat(),
+                reason=reason,
+                upload_status="disabled",
+                job_id=None,
+                labels=labels,
+                thumbnail=thumbnail,
+            )
+            return {
+                "ok": False,
+                "reason": reason,
+                "local_path": local_path,
+                "capture_id": capture_id,
+                "error": "Supabase not configured",
+            }
 
-        if upload.get("ok"):
-            try:
-                os.remove(local_path)
-            except OSError:
-                pass
+        storage_path = build_storage_path(filename)
+        job_id = self.upload_queue.enqueue(local_path, storage_path)
+        capture_id = self.face_db.add_capture(
+            path=local_path,
+            storage_path=storage_path,
+            captured_at=ts.isoformat(),
+            reason=reason,
+            upload_status="pending",
+            job_id=job_id,
+            labels=labels,
+            thumbnail=thumbnail,
+        )
+        # A worker may finish the job before the row above exists, so its listener update would match nothing.
+        # Reading the job back after the insert catches that case; later finishes go through the listener.
+        job = self.upload_queue.get_job(job_id)
+        if job is not None and job["status"] in ("done", "failed"):
+            self.face_db.update_capture_upload(job_id, job["status"], job.get("url"))
 
         return {
-            "ok": upload.get("ok", False),
+            "ok": True,
             "reason": reason,
             "local_path": local_path,
-            "upload_url": upload.get("url"),
-            "error": upload.get("error"),
+            "capture_id": capture_id,
+            "job_id": job_id,
+            "status": "pending",
         }
 
+    def _thumbnail(self, frame: np.ndarray) -> bytes | None:
+        height, width = frame.shape[:2]
+        if width <= 0 or height <= 0:
+            return None
+        scale = self.thumbnail_width / float(width)
+        size = (self.thumbnail_width, max(1, int(round(height * scale))))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", small, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
+        return encoded.tobytes() if ok else None
+
+    def get_dedup_stats(self) -> dict[str, Any]:
+        with self._lock:
+            candidates = self._candidates
+            skipped = self._skipped
+            recent = [
+                {
+                    "capture_id": item["capture_id"],
+                    "local_path": item["local_path"],
+                    "duplicates": item["duplicates"],
+                }
+                for item in self._recent
+            ]
+        return {
+            "candidates": candidates,
+            "skipped": skipped,
+            "dedup_rate": round(skipped / candidates, 4) if candidates else 0.0,
+            "distance": self.dedup_distance,
+            "recent": recent,
+        }
+
+    def _find_duplicate(self, frame_hash: int) -> dict[str, Any] | None:
+        for item in reversed(self._recent):
+            if (item["hash"] ^ frame_hash).bit_count() <= self.dedup_distance:
+                return item
+        return None
+
+    def _auto_capture(self) -> None:
+        if self.dedup_distance < 0:
+            self.request_capture(reason="auto")
+            return
+        frame = self.detector.get_latest_frame(annotated=False, copy=False)
+        if frame is None:
+            return
+        frame_hash = _dhash(frame)
+        with self._lock:
+            self._candidates += 1
+            duplicate = self._find_duplicate(frame_hash)
+            if duplicate is not None:
+                duplicate["duplicates"] += 1
+                self._skipped += 1
+        if duplicate is not None:
+            self.face_db.add_capture_duplicate(duplicate["capture_id"])
+            return
+        result = self.request_capture(reason="auto")
+        if result.get("capture_id"):
+            with self._lock:
+                self._recent.append(
+                    {
+                        "hash": frame_hash,
+                        "capture_id": result["capture_id"],
+                        "local_path": result["local_path"],
+                        "duplicates": 0,
+                    }
+                )
+
     def _loop(self) -> None:
         while not self._stop.is_set():
-            time.sleep(self.interval_s)
-            if self.detector.has_label("person"):
-                self.request_capture(reason="auto")
+            _wait_for_people(self.detector, self._events, self.interval_s)
+            if not self._stop.is_set() and self.detector.has_label("person"):
+                self._auto_capture()
 
 
 class FaceRecognitionService:
@@ -98,6 +246,10 @@ class FaceRecognitionService:
         unknown_threshold: float,
         interval_s: int,
         security_unknown_seconds: int,
+        tracked_ids: int = 1000,
+        track_ttl_s: float = 3600.0,
+        max_auto_samples: int = 50,
+        event_min_interval_s: float = 1.0,
     ) -> None:
         self.detector = detector
         self.face_service = face_service
@@ -106,24 +258,33 @@ class FaceRecognitionService:
         self.unknown_threshold = float(unknown_threshold)
         self.interval_s = max(5, int(interval_s))
         self.security_unknown_seconds = max(1, int(security_unknown_seconds))
+        self.max_auto_samples = max(1, int(max_auto_samples))
+        self.event_min_interval_s = max(0.0, float(event_min_interval_s))
 
         self._stop = threading.Event()
         self._thread: threading.Thread | None = None
+        self._events = None
         self._lock = threading.Lock()
         self._last_result: dict[str, Any] | None = None
-        self._recognized_counts: dict[int, int] = {}
+        # Per-identity sighting counts; identities not seen for track_ttl_s start over.
+        self._recognized_counts = BoundedDict(tracked_ids, track_ttl_s)
         self._unknown_seen: dict[int, float] = {}
         self._unknown_alerted: set[int] = set()
         self._security_status: dict[str, Any] = {"unknowns": [], "threshold_s": self.security_unknown_seconds}
+        self._analyzed: dict[str, Any] | None = None
+        self._analyzed_cond = threading.Condition()
 
     def start(self) -> None:
         if self._thread is not None:
             return
+        self._events = self.detector.bus.subscribe(_PERSON_TOPICS, min_interval_s=self.event_min_interval_s)
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
         self._stop.set()
+        if self._events is not None:
+            self._events.close()
         if self._thread is not None:
             self._thread.join(timeout=2)
 
@@ -131,10 +292,43 @@ class FaceRecognitionService:
         with self._lock:
             return dict(self._last_result) if self._last_result else None
 
-    def _set_last(self, payload: dict[str, Any]) -> None:
+    def _set_last(self, payload: dict[str, Any], trace: dict[str, Any] | None = None) -> None:
+        payload["trace"] = result_trace(trace, "face")
         with self._lock:
             self._last_result = payload
 
+    def _set_analyzed(self, frame: np.ndarray, trace: dict[str, Any] | None, faces: list[dict[str, Any]]) -> None:
+        with self._analyzed_cond:
+            self._analyzed = {"frame": frame, "trace": trace, "faces": faces}
+            self._analyzed_cond.notify_all()
+
+    def get_analyzed(self, newer_than: int | None = None, timeout: float = 0.0) -> dict[str, Any] | None:
+        # The last frame this service analyzed, with its faces (bboxes and embeddings), so other services can
+        # reuse them instead of running detection and recognition again. Waits up to timeout for a frame newer
+        # than frame id newer_than.
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._analyzed_cond:
+            while True:
+                analyzed = self._analyzed
+                trace = analyzed["trace"] if analyzed is not None else None
+                if trace is not None and (newer_than is None or trace["frame_id"] > newer_than):
+                    return analyzed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._analyzed_cond.wait(remaining)
+
+    def get_tracking_sizes(self) -> dict[str, int]:
+        # The unknown maps only hold faces in the latest frame; they are pruned on every pass.
+        return {
+            "recognized_ids": len(self._recognized_counts),
+            "unknowns_tracked": len(self._unknown_seen),
+            "unknowns_alerted": len(self._unknown_alerted),
+        }
+
+    def expire_tracking(self) -> int:
+        return self._recognized_counts.expire()
+
     def get_security_status(self) -> dict[str, Any]:
         with self._lock:
             return dict(self._security_status)
@@ -168,13 +362,14 @@ class FaceRecognitionService:
 
     def _loop(self) -> None:
         while not self._stop.is_set():
-            time.sleep(self.interval_s)
-            if not self.detector.has_label("person"):
+            _wait_for_people(self.detector, self._events, self.interval_s)
+            if self._stop.is_set() or not self.detector.has_label("person"):
                 continue
-            frame = self.detector.get_latest_frame(annotated=False)
+            frame, trace = self.detector.get_frame()
             if frame is None:
                 continue
             faces = self.face_service.get_faces(frame)
+            self._set_analyzed(frame, trace, faces)
             if not faces:
                 self._set_last(
                     {
@@ -182,7 +377,8 @@ class FaceRecognitionService:
                         "error": "no_face",
                         "timestamp": now_utc().isoformat(),
                         "faces": [],
-                    }
+                    },
+                    trace,
                 )
                 continue
 
@@ -193,7 +389,8 @@ class FaceRecognitionService:
             for face in faces:
                 embedding = face["embedding"]
                 bbox = face["bbox"]
-                matches = self._best_matches(embedding)
+                with stage("face_match"):
+                    matches = self._best_matches(embedding)
                 if matches:
                     best = matches[0]
                     if best["score"] > best_score:
@@ -202,7 +399,7 @@ class FaceRecognitionService:
                     face_id = int(best["id"])
                     self._recognized_counts[face_id] = self._recognized_counts.get(face_id, 0) + 1
                     if self._recognized_counts[face_id] == 3:
-                        self.face_db.add_face_sample(face_id, embedding)
+                        self.face_db.add_face_sample(face_id, embedding, auto=True, max_auto=self.max_auto_samples)
                         self._recognized_counts[face_id] = 0
                     self.face_db.add_event(
                         event_type="face_recognized",
@@ -211,11 +408,21 @@ class FaceRecognitionService:
                         name=best["name"],
                         score=best["score"],
                         bbox=bbox,
+                        trace=trace,
+                    )
+                    results.append(
+                        {
+                            "bbox": bbox,
+                            "face_type": "known",
+                            "best": best,
+                            "matches": matches,
+                            "quality": face.get("quality"),
+                        }
                     )
-                    results.append({"bbox": bbox, "best": best, "matches": matches})
                     continue
 
-                unknown_id, unknown_score = self._best_unknown(embedding)
+                with stage("face_match"):
+                    unknown_id, unknown_score = self._best_unknown(embedding)
                 if unknown_id is None:
                     unknown_id = self.face_db.add_unknown(embedding)
                 else:
@@ -229,12 +436,15 @@ class FaceRecognitionService:
                     name=unknown_name,
                     score=unknown_score,
                     bbox=bbox,
+                    trace=trace,
                 )
                 results.append(
                     {
                         "bbox": bbox,
+                        "face_type": "unknown",
                         "best": {"id": unknown_id, "name": unknown_name, "score": unknown_score},
                         "matches": [],
+                        "quality": face.get("quality"),
                     }
                 )
 
@@ -254,6 +464,7 @@ class FaceRecognitionService:
                         name=f"Unknown #{unknown_id}",
                         score=None,
                         bbox=None,
+                        trace=trace,
                     )
                     alerted = True
                 security_unknowns.append(
@@ -277,7 +488,8 @@ class FaceRecognitionService:
                     "faces": results,
                     "threshold": self.threshold,
                     "timestamp": now_utc().isoformat(),
-                }
+                },
+                trace,
             )
             with self._lock:
                 self._security_status = {
@@ -295,28 +507,55 @@ class EmotionService:
         hf_token: str | None,
         interval_s: int,
         threshold: float,
+        http_client,
+        face_service=None,
+        local_model=None,
+        face_recognition_service=None,
+        cache_ttl_s: float = 60.0,
+        cache_similarity: float = 0.6,
+        cache_hash_distance: int = 8,
+        cache_size: int = 64,
+        event_min_interval_s: float = 1.0,
     ) -> None:
         self.detector = detector
+        self.http_client = http_client
         self.hf_url = hf_url
         self.hf_token = hf_token
         self.interval_s = max(5, int(interval_s))
         self.threshold = float(threshold)
+        self.face_service = face_service
+        self.local_model = local_model
+        self.face_recognition_service = face_recognition_service
+        self.cache_ttl_s = max(0.0, float(cache_ttl_s))
+        self.cache_similarity = float(cache_similarity)
+        self.cache_hash_distance = max(0, int(cache_hash_distance))
+        self.event_min_interval_s = max(0.0, float(event_min_interval_s))
 
         self._stop = threading.Event()
         self._thread: threading.Thread | None = None
+        self._events = None
         self._lock = threading.Lock()
         self._last_result: dict[str, Any] | None = None
+        self._cache: deque[dict[str, Any]] = deque(maxlen=max(1, int(cache_size)))
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._last_frame_id: int | None = None
+        self._faces_reused = 0
+        self._faces_detected = 0
 
     def start(self) -> None:
         if self._thread is not None:
             return
-        if not self.hf_token:
+        if not self.hf_token and not self.has_local():
             return
+        self._events = self.detector.bus.subscribe(_PERSON_TOPICS, min_interval_s=self.event_min_interval_s)
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
         self._stop.set()
+        if self._events is not None:
+            self._events.close()
         if self._thread is not None:
             self._thread.join(timeout=2)
 
@@ -324,18 +563,149 @@ class EmotionService:
         with self._lock:
             return dict(self._last_result) if self._last_result else None
 
-    def _set_last(self, payload: dict[str, Any]) -> None:
+    def _set_last(self, payload: dict[str, Any], trace: dict[str, Any] | None = None) -> None:
+        payload["trace"] = result_trace(trace, "emotion")
         with self._lock:
             self._last_result = payload
 
+    def has_local(self) -> bool:
+        return self.local_model is not None and self.face_service is not None and self.face_service.is_ready()
+
+    def get_cache_stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits = self._cache_hits
+            misses = self._cache_misses
+            size = len(self._cache)
+            reused = self._faces_reused
+            detected = self._faces_detected
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "size": size,
+            # Frames whose faces came from face recognition versus frames that needed their own face pass.
+            "faces_reused": reused,
+            "faces_detected": detected,
+        }
+
+    def _cache_lookup(self, embedding, crop_hash: int) -> list[dict[str, Any]] | None:
+        if self.cache_ttl_s <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            for entry in reversed(self._cache):
+                if now - entry["ts"] > self.cache_ttl_s:
+                    continue
+                if (entry["hash"] ^ crop_hash).bit_count() > self.cache_hash_distance:
+                    continue
+                # Face entries carry an embedding; whole-frame entries from the remote path do not.
+                if (embedding is None) != (entry["embedding"] is None):
+                    continue
+                if embedding is not None and float(np.dot(entry["embedding"], embedding)) < self.cache_similarity:
+                    continue
+                self._cache_hits += 1
+                return entry["result"]
+            self._cache_misses += 1
+        return None
+
+    def _cache_store(self, embedding, crop_hash: int, result: list[dict[str, Any]]) -> None:
+        with self._lock:
+            self._cache.append({"embedding": embedding, "hash": crop_hash, "result": result, "ts": time.time()})
+
+    def _next_frame(self) -> tuple[np.ndarray | None, dict[str, Any] | None, list[dict[str, Any]] | None]:
+        # Prefer the frame face recognition analyzes next, so its faces are reused instead of detected again.
+        if self.face_recognition_service is not None and self.has_local():
+            analyzed = self.face_recognition_service.get_analyzed(self._last_frame_id, timeout=_FACE_REUSE_WAIT_S)
+            if analyzed is not None and time.monotonic() - analyzed["trace"]["read_at"] <= self.interval_s:
+                return analyzed["frame"], analyzed["trace"], analyzed["faces"]
+        frame, trace = self.detector.get_frame()
+        return frame, trace, None
+
+    def classify_local(
+        self, frame: np.ndarray, use_cache: bool = True, faces: list[dict[str, Any]] | None = None
+    ) -> dict[str, Any] | None:
+        if not self.has_local():
+            return None
+        try:
+            if faces is None:
+                faces = self.face_service.get_faces(frame)
+                with self._lock:
+                    self._faces_detected += 1
+            else:
+                with self._lock:
+                    self._faces_reused += 1
+            if not faces:
+                return {"ok": False, "error": "no_face", "backend": "local", "timestamp": now_utc().isoformat()}
+            crops = crop_faces(frame, faces)
+            predictions: list[list[dict[str, Any]] | None] = [None] * len(faces)
+            keys: list[tuple[Any, int]] = []
+            for i, (face, crop) in enumerate(zip(faces, crops)):
+                embedding = face.get("embedding")
+                if embedding is not None:
+                    embedding = np.asarray(embedding, dtype=np.float32)
+                    embedding = embedding / (np.linalg.norm(embedding) + 1e-10)
+                keys.append((embedding, _dhash(crop)))
+                if use_cache:
+                    predictions[i] = self._cache_lookup(*keys[i])
+            misses = [i for i, prediction in enumerate(predictions) if prediction is None]
+            if misses:
+                # One batched inference call for every face the cache could not answer.
+                with stage("emotion_local"):
+                    batch = self.local_model.classify([crops[i] for i in misses])
+                for i, prediction in zip(misses, batch):
+                    predictions[i] = prediction
+                    if use_cache:
+                        self._cache_store(keys[i][0], keys[i][1], prediction)
+        except Exception:
+            return None
+
+        results = []
+        for face, prediction in zip(faces, predictions):
+            filtered = [item for item in prediction if item["score"] >= self.threshold]
+            results.append({"bbox": face["bbox"], "best": filtered[0] if filtered else None, "result": filtered})
+        primary = max(
+            results,
+            key=lambda item: (item["bbox"][2] - item["bbox"][0]) * (item["bbox"][3] - item["bbox"][1]),
+        )
+        return {
+            "ok": True,
+            "backend": "local",
+            "result": primary["result"],
+            "faces": results,
+            "timestamp": now_utc().isoformat(),
+        }
+
     def _loop(self) -> None:
         while not self._stop.is_set():
-            time.sleep(self.interval_s)
-            if not self.detector.has_label("person"):
+            _wait_for_people(self.detector, self._events, self.interval_s)
+            if self._stop.is_set() or not self.detector.has_label("person"):
                 continue
-            frame = self.detector.get_latest_frame(annotated=False)
+            frame, trace, faces = self._next_frame()
             if frame is None:
                 continue
+            if trace is not None:
+                self._last_frame_id = trace["frame_id"]
+            local = self.classify_local(frame, faces=faces)
+            if local is not None:
+                self._set_last(local, trace)
+                continue
+            if not self.hf_token:
+                continue
+            frame_hash = _dhash(frame)
+            cached = self._cache_lookup(None, frame_hash)
+            if cached is not None:
+                self._set_last(
+                    {
+                        "ok": True,
+                        "backend": "remote",
+                        "cached": True,
+                        "result": cached,
+                        "timestamp": now_utc().isoformat(),
+                    },
+                    trace,
+                )
+                continue
             ok, encoded = cv2.imencode(".jpg", frame)
             if not ok:
                 continue
@@ -344,16 +714,17 @@ class EmotionService:
                 "Content-Type": "image/jpeg",
             }
             try:
-                resp = requests.post(
-                    self.hf_url,
-                    headers=headers,
-                    data=encoded.tobytes(),
-                    timeout=30,
-                )
+                with stage("emotion_remote"):
+                    resp = self.http_client.post(self.hf_url, data=encoded.tobytes(), headers=headers)
                 payload = resp.json()
+            except CircuitOpenError:
+                self._set_last(
+                    {"ok": False, "error": "hf_circuit_open", "timestamp": now_utc().isoformat()}, trace
+                )
+                continue
             except Exception:
                 self._set_last(
-                    {"ok": False, "error": "hf_request_failed", "timestamp": now_utc().isoformat()}
+                    {"ok": False, "error": "hf_request_failed", "timestamp": now_utc().isoformat()}, trace
                 )
                 continue
 
@@ -363,7 +734,8 @@ class EmotionService:
                         "ok": False,
                         "error": payload,
                         "timestamp": now_utc().isoformat(),
-                    }
+                    },
+                    trace,
                 )
                 continue
 
@@ -374,32 +746,48 @@ class EmotionService:
                     for item in payload
                     if float(item.get("score", 0.0)) >= self.threshold
                 ]
+            self._cache_store(None, frame_hash, filtered)
             self._set_last(
-                {"ok": True, "result": filtered, "timestamp": now_utc().isoformat()}
+                {"ok": True, "backend": "remote", "result": filtered, "timestamp": now_utc().isoformat()}, trace
             )
 
 
 class ActionTrackingService:
-    def __init__(self, detector, action_service, face_db, interval_s: int, threshold: float) -> None:
+    def __init__(
+        self,
+        detector,
+        action_service,
+        face_db,
+        interval_s: int,
+        threshold: float,
+        face_recognition_service=None,
+        event_min_interval_s: float = 1.0,
+    ) -> None:
         self.detector = detector
         self.action_service = action_service
         self.face_db = face_db
         self.interval_s = max(5, int(interval_s))
         self.threshold = float(threshold)
+        self.face_recognition_service = face_recognition_service
+        self.event_min_interval_s = max(0.0, float(event_min_interval_s))
 
         self._stop = threading.Event()
         self._thread: threading.Thread | None = None
+        self._events = None
         self._lock = threading.Lock()
         self._last_result: dict[str, Any] | None = None
 
     def start(self) -> None:
         if self._thread is not None:
             return
+        self._events = self.detector.bus.subscribe(_PERSON_TOPICS, min_interval_s=self.event_min_interval_s)
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
         self._stop.set()
+        if self._events is not None:
+            self._events.close()
         if self._thread is not None:
             self._thread.join(timeout=2)
 
@@ -407,28 +795,67 @@ class ActionTrackingService:
         with self._lock:
             return dict(self._last_result) if self._last_result else None
 
-    def _set_last(self, payload: dict[str, Any]) -> None:
+    def _set_last(self, payload: dict[str, Any], trace: dict[str, Any] | None = None) -> None:
+        payload["trace"] = result_trace(trace, "action")
         with self._lock:
             self._last_result = payload
 
+    def _identify(self, bbox: list[float] | None) -> dict[str, Any] | None:
+        if bbox is None or self.face_recognition_service is None:
+            return None
+        last = self.face_recognition_service.get_last()
+        if not last or not last.get("ok"):
+            return None
+        for face in last.get("faces") or []:
+            fx1, fy1, fx2, fy2 = face["bbox"]
+            cx = (fx1 + fx2) / 2
+            cy = (fy1 + fy2) / 2
+            if bbox[0] <= cx <= bbox[2] and bbox[1] <= cy <= bbox[3] and face.get("best"):
+                return {**face["best"], "face_type": face.get("face_type")}
+        return None
+
     def _loop(self) -> None:
         while not self._stop.is_set():
-            time.sleep(self.interval_s)
-            if not self.detector.has_label("person"):
+            if _wait_for_people(self.detector, self._events, self.interval_s):
+                # Someone just arrived; give the clip a full window of them before classifying.
+                self._stop.wait(self.action_service.window_s)
+            if self._stop.is_set() or not self.detector.has_label("person"):
                 continue
             result = self.action_service.run_once()
             if not result:
                 continue
-            best = result.get("best")
-            if best and float(best.get("score", 0.0)) >= self.threshold:
-                self.face_db.add_event(
-                    event_type="action_detected",
-                    face_type="behavior",
-                    face_id=None,
-                    name=best.get("label"),
-                    score=best.get("score"),
-                    bbox=None,
+            people = []
+            for person in result.get("people") or [result]:
+                best = person.get("best")
+                identity = self._identify(person.get("bbox"))
+                # Unknown ids come from another table, so only a known face is linked to the event.
+                known = identity if identity and identity.get("face_type") == "known" else None
+                if best and float(best.get("score", 0.0)) >= self.threshold:
+                    self.face_db.add_event(
+                        event_type="action_detected",
+                        face_type="behavior",
+                        face_id=known.get("id") if known else None,
+                        name=best.get("label"),
+                        score=best.get("score"),
+                        bbox=person.get("bbox"),
+                        trace=result.get("trace"),
+                    )
+                topk = [item for item in person.get("topk", []) if float(item.get("score", 0.0)) >= self.threshold]
+                people.append(
+                    {
+                        "bbox": person.get("bbox"),
+                        "identity": identity,
+                        "best": best if topk else None,
+                        "topk": topk,
+                    }
                 )
+            best = result.get("best")
             topk = [item for item in result.get("topk", []) if float(item.get("score", 0.0)) >= self.threshold]
-            payload = {"ok": True, "best": best if topk else None, "topk": topk, "timestamp": now_utc().isoformat()}
-            self._set_last(payload)
+            payload = {
+                "ok": True,
+                "best": best if topk else None,
+                "topk": topk,
+                "people": people,
+                "timestamp": now_utc().isoformat(),
+            }
+            self._set_last(payload, result.get("trace"))
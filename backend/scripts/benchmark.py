@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from detector import Detector  # noqa: E402
+from face_db import FaceDB  # noqa: E402
+from face_service import FaceService  # noqa: E402
+from http_client import InferenceClient  # noqa: E402
+from scheduler import FaceRecognitionService  # noqa: E402
+from streamer import mjpeg_generator  # noqa: E402
+
+from fakes import EMBEDDING_DIM, FakeFaceApp, FakeHFHandler, FakeYOLO, synthetic_frame  # noqa: E402
+
+SEED = 1234
+GALLERY_SIZES = "1000,10000,100000,1000000"
+
+
+def _timeit(fn, repeat: int, number: int = 1) -> dict:
+    fn()  # warm-up, not recorded
+    samples = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "repeat": repeat,
+        "number": number,
+        "median_ms": round(statistics.median(samples) * 1000, 4),
+        "min_ms": round(min(samples) * 1000, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+        "ops_per_s": round(1.0 / statistics.median(samples), 2) if statistics.median(samples) > 0 else None,
+    }
+
+
+def _embeddings(rng: np.random.Generator, count: int) -> np.ndarray:
+    emb = rng.standard_normal((count, EMBEDDING_DIM), dtype=np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    return emb
+
+
+# --- benchmark-only stand-ins ------------------------------------------------
+
+
+class _FakeFrameSource:
+    def __init__(self, frame: np.ndarray) -> None:
+        self._frame = frame
+
+    def get_latest_frame(self, annotated: bool = True, copy: bool = True):
+        return self._frame.copy() if copy else self._frame
+
+
+class _FakeRecognitionResult:
+    def __init__(self, faces: int) -> None:
+        self._last = {
+            "ok": True,
+            "faces": [
+                {"bbox": [40 + i * 90, 60, 120 + i * 90, 160], "best": {"id": i, "name": f"Person {i}", "score": 0.8}}
+                for i in range(faces)
+            ],
+        }
+
+    def get_last(self):
+        return self._last
+
+
+# --- benchmarks ---------------------------------------------------------------
+
+
+def _fill_gallery(db: FaceDB, rng: np.random.Generator, size: int, chunk: int = 20000) -> None:
+    now = datetime.utcnow().isoformat()
+    remaining = size
+    while remaining > 0:
+        count = min(chunk, remaining)
+        embs = _embeddings(rng, count)
+        # Bulk-loaded directly; only the read side is being measured here.
+        with db._conn:
+            db._conn.executemany(
+                "INSERT INTO faces (name, embedding, dim, created_at) VALUES (?, ?, ?, ?)",
+                [(f"person-{size - remaining + i}", emb.tobytes(), EMBEDDING_DIM, now) for i, emb in enumerate(embs)],
+            )
+            db._conn.executemany(
+                "INSERT INTO unknown_faces (embedding, dim, first_seen, last_seen, sightings) VALUES (?, ?, ?, ?, 1)",
+                [(emb.tobytes(), EMBEDDING_DIM, now, now) for emb in embs],
+            )
+        remaining -= count
+
+
+def bench_matching(workdir: str, sizes: list[int]) -> dict:
+    results = {}
+    for size in sizes:
+        rng = np.random.default_rng(SEED)
+        path = os.path.join(workdir, f"gallery_{size}.db")
+        db = FaceDB(path)
+        _fill_gallery(db, rng, size)
+        service = FaceRecognitionService(
+            detector=None,
+            face_service=None,
+            face_db=db,
+            threshold=0.45,
+            unknown_threshold=0.5,
+            interval_s=10,
+            security_unknown_seconds=5,
+        )
+        probe = _embeddings(rng, 1)[0]
+        repeat = 3 if size >= 100_000 else 10
+        results[str(size)] = {
+            "best_matches": _timeit(lambda: service._best_matches(probe), repeat),
+            "best_unknown": _timeit(lambda: service._best_unknown(probe), repeat),
+        }
+        db._conn.close()
+        os.remove(path)
+    return results
+
+
+def bench_face_db(workdir: str, inserts: int) -> dict:
+    rng = np.random.default_rng(SEED)
+    db = FaceDB(os.path.join(workdir, "face_db.db"))
+    embs = _embeddings(rng, inserts)
+    bbox = [10.0, 20.0, 110.0, 140.0]
+
+    def _timed(fn, count: int) -> dict:
+        started = time.perf_counter()
+        for i in range(count):
+            fn(i)
+        elapsed = time.perf_counter() - started
+        return {"count": count, "total_s": round(elapsed, 4), "ops_per_s": round(count / elapsed, 1)}
+
+    results = {
+        "add": _timed(lambda i: db.add(f"person-{i}", embs[i]), inserts),
+        "add_face_sample": _timed(lambda i: db.add_face_sample(1 + i % 100, embs[i]), inserts),
+        "add_unknown": _timed(lambda i: db.add_unknown(embs[i]), inserts),
+        "add_event": _timed(
+            lambda i: db.add_event("face_recognized", "known", i % 100, f"person-{i % 100}", 0.8, bbox),
+            inserts,
+        ),
+        "enroll_10_samples": _timed(lambda i: db.enroll(f"bulk-{i}", list(embs[i : i + 10])), max(1, inserts // 10)),
+    }
+    results["iter_embeddings"] = _timeit(lambda: sum(1 for _ in db.iter_embeddings()), 5)
+    results["iter_embeddings"]["rows"] = sum(1 for _ in db.iter_embeddings())
+    results["list_events_100"] = _timeit(lambda: db.list_events(limit=100), 20)
+    results["list_attendance_50"] = _timeit(lambda: db.list_attendance(limit=50), 20)
+    db._conn.close()
+    return results
+
+
+def bench_mjpeg(frames: int) -> dict:
+    rng = np.random.default_rng(SEED)
+    results = {}
+    for width, height in ((640, 480), (1280, 720), (1920, 1080)):
+        source = _FakeFrameSource(synthetic_frame(rng, width, height))
+        for faces in (0, 3):
+            recognition = _FakeRecognitionResult(faces) if faces else None
+            generator = mjpeg_generator(source, fps=1_000_000, face_recognition_service=recognition)
+            next(generator)
+            started = time.perf_counter()
+            size = 0
+            for _ in range(frames):
+                size += len(next(generator))
+            elapsed = time.perf_counter() - started
+            results[f"{width}x{height}_faces{faces}"] = {
+                "frames": frames,
+                "fps": round(frames / elapsed, 1),
+                "ms_per_frame": round(elapsed / frames * 1000, 3),
+                "avg_kb": round(size / frames / 1024, 1),
+            }
+    return results
+
+
+def bench_detector_postprocess(repeat: int) -> dict:
+    results = {}
+    for boxes in (1, 10, 50):
+        rng = np.random.default_rng(SEED)
+        frame = synthetic_frame(rng, 1280, 720)
+        detector = Detector(model_path="benchmark-stand-in", use_gpu=False)
+        detector.model = FakeYOLO(rng, boxes, 1280, 720)
+        predictions = detector.model.predict()
+        results[f"boxes_{boxes}"] = _timeit(lambda: detector._postprocess(frame.copy(), predictions), repeat)
+    return results
+
+
+def bench_face_pipeline(repeat: int) -> dict:
+    results = {}
+    for faces in (1, 5, 20):
+        rng = np.random.default_rng(SEED)
+        frame = synthetic_frame(rng, 1280, 720)
+        service = FaceService(model_name="benchmark-stand-in", use_gpu=False, min_quality=0.5)
+        service._app = FakeFaceApp(rng, faces, 1280, 720)
+        results[f"faces_{faces}"] = _timeit(lambda: service.get_faces(frame), repeat)
+        results[f"faces_{faces}"]["kept"] = len(service.get_faces(frame))
+    return results
+
+
+def bench_remote(requests_count: int, delay_ms: float) -> dict:
+    FakeHFHandler.delay_s = delay_ms / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeHFHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/models/emotion"
+    payload = bytes(20_000)
+    results = {}
+    try:
+        for concurrency in (1, 4):
+            client = InferenceClient(
+                pool_size=concurrency,
+                concurrency=concurrency,
+                timeout_s=10,
+                failure_threshold=5,
+                reset_s=30,
+            )
+            latencies: list[float] = []
+            lock = threading.Lock()
+
+            def _worker(count: int) -> None:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    client.post(url, data=payload, headers={"Content-Type": "image/jpeg"}).json()
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+
+            client.post(url, data=payload).json()
+            started = time.perf_counter()
+            workers = [
+                threading.Thread(target=_worker, args=(requests_count // concurrency,)) for _ in range(concurrency)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+            latencies.sort()
+            results[f"concurrency_{concurrency}"] = {
+                "requests": len(latencies),
+                "server_delay_ms": delay_ms,
+                "requests_per_s": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+                "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+            }
+    finally:
+        server.shutdown()
+    return results
+
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": SEED,
+    }
+
+
+BENCHMARKS = ("matching", "face_db", "mjpeg", "detector", "face_pipeline", "remote")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline CPU benchmarks with deterministic model stand-ins.")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated subset to run")
+    parser.add_argument("--gallery-sizes", default=GALLERY_SIZES)
+    parser.add_argument("--db-inserts", type=int, default=2000)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--remote-requests", type=int, default=400)
+    parser.add_argument("--remote-delay-ms", type=float, default=0.0)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.gallery_sizes.split(",") if size.strip()]
+    if args.quick:
+        sizes = [size for size in sizes if size <= 10_000] or sizes[:1]
+        args.db_inserts = min(args.db_inserts, 200)
+        args.frames = min(args.frames, 30)
+        args.repeat = min(args.repeat, 10)
+        args.remote_requests = min(args.remote_requests, 40)
+
+    report = {"meta": _meta(), "results": {}}
+    with tempfile.TemporaryDirectory(prefix="vision-bench-") as workdir:
+        runners = {
+            "matching": lambda: bench_matching(workdir, sizes),
+            "face_db": lambda: bench_face_db(workdir, args.db_inserts),
+            "mjpeg": lambda: bench_mjpeg(args.frames),
+            "detector": lambda: bench_detector_postprocess(args.repeat),
+            "face_pipeline": lambda: bench_face_pipeline(args.repeat),
+            "remote": lambda: bench_remote(args.remote_requests, args.remote_delay_ms),
+        }
+        for name in selected:
+            started = time.perf_counter()
+            report["results"][name] = runners[name]()
+            print(f"{name}: done in {time.perf_counter() - started:.1f}s")
+            print(json.dumps(report["results"][name], indent=2))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fakes import FakeHFHandler, FakePostgrestHandler  # noqa: E402
+from http_client import CircuitOpenError, DeadlineExceededError, InferenceClient  # noqa: E402
+from migrate_to_supabase import RestUpserter, _load_checkpoint, migrate_table  # noqa: E402
+
+
+@contextmanager
+def _serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def check_migration_resume(workdir: str) -> None:
+    db_path = os.path.join(workdir, "migrate.db")
+    checkpoint_path = os.path.join(workdir, "migrate_checkpoint.json")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE faces (id INTEGER PRIMARY KEY, name TEXT, embedding BLOB, dim INTEGER, created_at TEXT)")
+    # 1000 rows are five batches of 200.
+    conn.executemany(
+        "INSERT INTO faces VALUES (?, ?, ?, ?, ?)",
+        [(i, f"person-{i}", bytes(8), 2, "2026-01-01T00:00:00") for i in range(1, 1001)],
+    )
+    conn.commit()
+
+    # Throttled once, then two batches land and the third is rejected for good.
+    FakePostgrestHandler.reset(script=[429, 201, 201, 400], retry_after="0.2")
+    with _serve(FakePostgrestHandler) as url:
+        upserter = RestUpserter(url, "key", workers=1, retries=3, backoff_s=0.01)
+        checkpoint: dict = {}
+        started = time.perf_counter()
+        try:
+            migrate_table(conn, upserter, "faces", checkpoint, checkpoint_path, workers=1)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("a rejected batch should stop the migration")
+        assert time.perf_counter() - started >= 0.2, "Retry-After was not honored"
+        assert _load_checkpoint(checkpoint_path) == {"faces": 400}, _load_checkpoint(checkpoint_path)
+
+        FakePostgrestHandler.reset()
+        checkpoint = _load_checkpoint(checkpoint_path)
+        migrated = migrate_table(conn, upserter, "faces", checkpoint, checkpoint_path, workers=1)
+        assert migrated == 600, migrated
+        assert FakePostgrestHandler.posts == 3, FakePostgrestHandler.posts
+        assert sorted(FakePostgrestHandler.rows["faces"]) == list(range(401, 1001))
+        assert _load_checkpoint(checkpoint_path) == {"faces": 1000}
+    conn.close()
+
+
+def _reset_hf(status: int = 200, drip_s: float = 0.0) -> None:
+    FakeHFHandler.delay_s = 0.0
+    FakeHFHandler.drip_s = drip_s
+    FakeHFHandler.status = status
+    FakeHFHandler.posts = 0
+
+
+def check_http_deadline(workdir: str) -> None:
+    # About 4 s of body at 50 ms per byte; every single read is fast, only the whole call is slow.
+    _reset_hf(drip_s=0.05)
+    with _serve(FakeHFHandler) as url:
+        client = InferenceClient(pool_size=2, concurrency=1, timeout_s=0.5, failure_threshold=5, reset_s=30)
+        started = time.perf_counter()
+        try:
+            client.post(f"{url}/models/emotion", data=b"x")
+        except DeadlineExceededError:
+            pass
+        else:
+            raise AssertionError("a dripping response should exceed the deadline")
+        elapsed = time.perf_counter() - started
+        assert elapsed < 1.0, f"deadline of 0.5 s took {elapsed:.2f} s"
+
+        # The aborted call gives its slot back, so the next call is not refused as busy.
+        _reset_hf()
+        resp = client.post(f"{url}/models/emotion", data=b"x")
+        assert resp.status_code == 200 and resp.json()[0]["label"] == "neutral"
+        client.close()
+
+
+def check_http_breaker(workdir: str) -> None:
+    _reset_hf(status=503)
+    with _serve(FakeHFHandler) as url:
+        endpoint = f"{url}/models/emotion"
+        client = InferenceClient(pool_size=2, concurrency=2, timeout_s=5, failure_threshold=3, reset_s=1)
+        for _ in range(3):
+            assert client.post(endpoint, data=b"x").status_code == 503
+        state = client.get_status()
+        assert next(iter(state.values()))["state"] == "open", state
+        try:
+            client.post(endpoint, data=b"x")
+        except CircuitOpenError:
+            pass
+        else:
+            raise AssertionError("an open circuit should fail fast")
+        assert FakeHFHandler.posts == 3, FakeHFHandler.posts
+
+        # After reset_s one probe goes through; a healthy answer closes the circuit again.
+        time.sleep(1.1)
+        FakeHFHandler.status = 200
+        assert client.post(endpoint, data=b"x").status_code == 200
+        assert next(iter(client.get_status().values()))["state"] == "closed"
+        assert FakeHFHandler.posts == 4, FakeHFHandler.posts
+        client.close()
+
+
+CHECKS = {
+    "migration_resume": check_migration_resume,
+    "http_deadline": check_http_deadline,
+    "http_breaker": check_http_breaker,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Behaviour checks against local stub servers.")
+    parser.add_argument("--only", default=",".join(CHECKS), help="comma-separated subset to run")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in CHECKS]
+    if unknown:
+        raise SystemExit(f"Unknown checks: {', '.join(unknown)}")
+
+    failed = []
+    for name in selected:
+        with tempfile.TemporaryDirectory(prefix="vision-check-") as workdir:
+            started = time.perf_counter()
+            try:
+                CHECKS[name](workdir)
+            except Exception:
+                failed.append(name)
+                print(f"{name}: FAILED")
+                traceback.print_exc()
+                continue
+            print(f"{name}: ok ({time.perf_counter() - started:.1f}s)")
+    if failed:
+        raise SystemExit(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
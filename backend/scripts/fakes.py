@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import numpy as np
+
+EMBEDDING_DIM = 512
+
+
+def synthetic_frame(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    # Smooth gradients plus noise compress like a camera frame rather than pure noise.
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = (x[None, :] * 0.6 + y * 0.4)[..., None].repeat(3, axis=2)
+    noise = rng.normal(0, 12, (height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+# Just enough of a torch tensor for Detector._postprocess.
+class _FakeTensor:
+    def __init__(self, value) -> None:
+        self._value = np.asarray(value)
+
+    def __getitem__(self, index):
+        return _FakeTensor(self._value[index])
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._value
+
+    def item(self):
+        return self._value.item()
+
+
+class _FakeBox:
+    def __init__(self, xyxy, conf, cls) -> None:
+        self.xyxy = _FakeTensor([xyxy])
+        self.conf = _FakeTensor([conf])
+        self.cls = _FakeTensor([cls])
+
+
+class _FakeResult:
+    def __init__(self, boxes) -> None:
+        self.boxes = boxes
+
+
+class FakeYOLO:
+    names = {0: "person", 1: "bicycle", 2: "car", 56: "chair", 62: "tv"}
+
+    def __init__(self, rng: np.random.Generator, boxes: int, width: int, height: int) -> None:
+        classes = list(self.names)
+        self._results = [_FakeResult([self._box(rng, classes, width, height) for _ in range(boxes)])]
+
+    @staticmethod
+    def _box(rng, classes, width, height) -> _FakeBox:
+        x1 = float(rng.uniform(0, width * 0.8))
+        y1 = float(rng.uniform(0, height * 0.8))
+        x2 = min(width, x1 + float(rng.uniform(20, width * 0.2)))
+        y2 = min(height, y1 + float(rng.uniform(20, height * 0.3)))
+        return _FakeBox([x1, y1, x2, y2], float(rng.uniform(0.25, 0.99)), int(rng.choice(classes)))
+
+    def predict(self, **kwargs):
+        return self._results
+
+
+class _FakeDetModel:
+    def __init__(self, rng: np.random.Generator, faces: int, width: int, height: int) -> None:
+        boxes = []
+        kpss = []
+        for _ in range(faces):
+            size = float(rng.uniform(40, 160))
+            x1 = float(rng.uniform(0, width - size))
+            y1 = float(rng.uniform(0, height - size))
+            boxes.append([x1, y1, x1 + size, y1 + size, float(rng.uniform(0.5, 0.99))])
+            cx, cy = x1 + size / 2, y1 + size / 2
+            kpss.append(
+                [
+                    [cx - size * 0.18, cy - size * 0.12],
+                    [cx + size * 0.18, cy - size * 0.12],
+                    [cx + float(rng.uniform(-0.1, 0.1)) * size, cy + size * 0.05],
+                    [cx - size * 0.14, cy + size * 0.22],
+                    [cx + size * 0.14, cy + size * 0.22],
+                ]
+            )
+        self._boxes = np.array(boxes, dtype=np.float32)
+        self._kpss = np.array(kpss, dtype=np.float32)
+
+    def detect(self, image, max_num=0, metric="default"):
+        return self._boxes, self._kpss
+
+
+class _FakeRecognizer:
+    input_size = (112, 112)
+
+    def get_feat(self, crops):
+        # Deterministic per crop content, at a fixed cost per face like the real model.
+        feats = []
+        for crop in crops:
+            seed = int(np.asarray(crop, dtype=np.uint32).sum()) % (2**32)
+            feats.append(np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32))
+        return np.stack(feats)
+
+
+class FakeFaceApp:
+    def __init__(self, rng: np.random.Generator, faces: int, width: int, height: int) -> None:
+        self.det_model = _FakeDetModel(rng, faces, width, height)
+        self.models = {"recognition": _FakeRecognizer()}
+
+
+class FakeHFHandler(BaseHTTPRequestHandler):
+    delay_s = 0.0
+    # Seconds between body bytes, for a server that keeps a call alive by dripping its response.
+    drip_s = 0.0
+    status = 200
+    posts = 0
+    body = json.dumps([{"label": "neutral", "score": 0.91}, {"label": "happy", "score": 0.05}]).encode()
+
+    def do_POST(self):  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        type(self).posts += 1
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        self.send_response(self.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        if not self.drip_s:
+            self.wfile.write(self.body)
+            return
+        try:
+            for i in range(len(self.body)):
+                self.wfile.write(self.body[i : i + 1])
+                self.wfile.flush()
+                time.sleep(self.drip_s)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class FakePostgrestHandler(BaseHTTPRequestHandler):
+    # Answers POSTs with the statuses in `script`, one per request, then 201. Accepted rows are kept per table.
+    script: list[int] = []
+    retry_after = "0"
+    rows: dict[str, dict] = {}
+    posts = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset(cls, script: list[int] | None = None, retry_after: str = "0") -> None:
+        with cls._lock:
+            cls.script = list(script or [])
+            cls.retry_after = retry_after
+            cls.rows = {}
+            cls.posts = 0
+
+    def do_POST(self):  # noqa: N802
+        rows = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"[]")
+        table = self.path.rstrip("/").rsplit("/", 1)[-1]
+        cls = type(self)
+        with cls._lock:
+            cls.posts += 1
+            status = cls.script.pop(0) if cls.script else 201
+            if status < 400:
+                stored = cls.rows.setdefault(table, {})
+                for row in rows:
+                    stored[row["id"]] = row
+        self.send_response(status)
+        if status in (429, 503):
+            self.send_header("Retry-After", cls.retry_after)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
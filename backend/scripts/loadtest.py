@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import requests
+
+try:
+    import psutil
+except ImportError:  # optional; /proc is used on Linux otherwise
+    psutil = None
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fakes import FakeFaceApp, FakeYOLO, synthetic_frame  # noqa: E402
+
+SEED = 1234
+
+# (path, poll interval in seconds) per open dashboard, taken from the frontend panels.
+POLLING_MIX = (
+    ("/detections", 0.8),
+    ("/security/last", 2.0),
+    ("/health", 3.0),
+    ("/audio/last", 3.0),
+    ("/face/last", 5.0),
+    ("/action/last", 5.0),
+    ("/timeline?limit=80", 5.0),
+    ("/attendance?limit=20", 5.0),
+)
+
+
+class SyntheticCamera:
+    def __init__(self, rng: np.random.Generator, width: int, height: int, fps: float) -> None:
+        self._frames = [synthetic_frame(rng, width, height) for _ in range(8)]
+        self._interval = 1.0 / max(1.0, fps)
+        self._next = 0.0
+        self._index = 0
+        self._lock = threading.Lock()
+        self._opened = False
+
+    def open(self) -> None:
+        self._opened = True
+
+    def close(self) -> None:
+        self._opened = False
+
+    def is_opened(self) -> bool:
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return None
+        # Paced like a real camera: each read waits for the next frame slot.
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+            self._index = (self._index + 1) % len(self._frames)
+            frame = self._frames[self._index]
+        if wait > 0:
+            time.sleep(wait)
+        return frame.copy()
+
+
+def serve(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="vision-load-")
+    # Everything is written to a scratch directory, and remote services are switched off.
+    os.environ.update(
+        {
+            "MODEL_PATH": "loadtest-stand-in",
+            "FACE_DB_PATH": os.path.join(workdir, "faces.db"),
+            "UPLOAD_QUEUE_PATH": os.path.join(workdir, "uploads.db"),
+            "CAPTURE_DIR": os.path.join(workdir, "captures"),
+            "CLIP_DIR": os.path.join(workdir, "clips"),
+            "SUPABASE_URL": "",
+            "SUPABASE_ANON_KEY": "",
+            "HF_TOKEN": "",
+            "EMOTION_LOCAL_MODEL": "",
+            "AUDIO_LOCAL_MODEL": "",
+            "STREAM_FPS": str(args.stream_fps),
+        }
+    )
+    os.chdir(BACKEND_DIR)
+    import uvicorn
+
+    import main
+    from startup import StartupLoader
+
+    rng = np.random.default_rng(SEED)
+    main.camera = SyntheticCamera(rng, args.width, args.height, args.camera_fps)
+    main.detector.model = FakeYOLO(rng, args.boxes, args.width, args.height)
+    main.face_service._app = FakeFaceApp(rng, args.faces, args.width, args.height)
+
+    # Only the detector and face pipelines run; action and audio need hardware or weights.
+    loader = StartupLoader()
+    loader.add("detector", main.detector.load, on_ready=main._start_detector)
+    loader.add("face", main.face_service.load, on_ready=main.face_recognition_service.start)
+    main.startup = loader
+
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def _cpu_seconds(pid: int) -> float | None:
+    if psutil is not None:
+        times = psutil.Process(pid).cpu_times()
+        return times.user + times.system
+    try:
+        with open(f"/proc/{pid}/stat", "r", encoding="utf-8") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return round(ordered[index] * 1000, 2)
+
+
+class _Step:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.stream_fps: list[float] = []
+        self.first_frame: list[float] = []
+        self.stream_errors = 0
+
+    def record(self, path: str, elapsed: float | None) -> None:
+        with self.lock:
+            if elapsed is None:
+                self.errors[path] = self.errors.get(path, 0) + 1
+            else:
+                self.latencies.setdefault(path, []).append(elapsed)
+
+
+def _poller(base: str, path: str, interval: float, deadline: float, step: _Step, session: requests.Session) -> None:
+    # Clients start out of phase so polls are spread like real dashboards opened at different times.
+    time.sleep(np.random.default_rng().uniform(0, interval))
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            resp = session.get(base + path, timeout=10)
+            ok = resp.status_code < 500
+        except requests.RequestException:
+            ok = False
+        step.record(path, time.perf_counter() - started if ok else None)
+        time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+def _stream_consumer(base: str, deadline: float, step: _Step) -> None:
+    boundary = b"--frame\r\n"
+    frames = 0
+    started = time.perf_counter()
+    first = None
+    tail = b""
+    try:
+        with requests.get(base + "/video-stream", stream=True, timeout=(5, 10)) as resp:
+            if resp.status_code != 200:
+                raise requests.RequestException(f"status {resp.status_code}")
+            for chunk in resp.iter_content(chunk_size=65536):
+                data = tail + chunk
+                count = data.count(boundary)
+                if count and first is None:
+                    first = time.perf_counter() - started
+                frames += count
+                tail = data[-(len(boundary) - 1) :]
+                if time.monotonic() >= deadline:
+                    break
+    except requests.RequestException:
+        with step.lock:
+            step.stream_errors += 1
+        return
+    elapsed = time.perf_counter() - started
+    with step.lock:
+        step.stream_fps.append(frames / elapsed if elapsed > 0 else 0.0)
+        if first is not None:
+            step.first_frame.append(first)
+
+
+def run_step(base: str, clients: int, duration: float, server_pid: int) -> dict:
+    step = _Step()
+    deadline = time.monotonic() + duration
+    threads = []
+    for _ in range(clients):
+        session = requests.Session()
+        threads.append(threading.Thread(target=_stream_consumer, args=(base, deadline, step), daemon=True))
+        for path, interval in POLLING_MIX:
+            threads.append(
+                threading.Thread(target=_poller, args=(base, path, interval, deadline, step, session), daemon=True)
+            )
+
+    cpu_before = _cpu_seconds(server_pid)
+    wall_before = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=duration + 15)
+    wall = time.perf_counter() - wall_before
+    cpu_after = _cpu_seconds(server_pid)
+
+    endpoints = {}
+    for path, _ in POLLING_MIX:
+        values = step.latencies.get(path, [])
+        endpoints[path] = {
+            "requests": len(values),
+            "errors": step.errors.get(path, 0),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "max_ms": round(max(values) * 1000, 2) if values else None,
+        }
+    cpu_percent = None
+    if cpu_before is not None and cpu_after is not None:
+        cpu_percent = round((cpu_after - cpu_before) / wall * 100, 1)
+    return {
+        "clients": clients,
+        "duration_s": round(wall, 2),
+        "server_cpu_percent": cpu_percent,
+        "stream": {
+            "consumers": clients,
+            "errors": step.stream_errors,
+            "fps_mean": round(float(np.mean(step.stream_fps)), 2) if step.stream_fps else None,
+            "fps_min": round(min(step.stream_fps), 2) if step.stream_fps else None,
+            "first_frame_p50_ms": _percentile(step.first_frame, 50),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def _wait_ready(base: str, server: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"server exited with code {server.returncode}")
+        try:
+            health = requests.get(base + "/health", timeout=2).json()
+            if health.get("model"):
+                return
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.5)
+    raise SystemExit("server did not become ready")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the API with a synthetic camera and fake models.")
+    parser.add_argument("--clients", default="1,2,4,8,16", help="comma-separated dashboard counts, one step each")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--camera-fps", type=float, default=30.0)
+    parser.add_argument("--stream-fps", type=int, default=10)
+    parser.add_argument("--boxes", type=int, default=5, help="detections per frame from the fake detector")
+    parser.add_argument("--faces", type=int, default=2, help="faces per frame from the fake face model")
+    parser.add_argument("--output", default="loadtest-results.json")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    command = [sys.executable, str(Path(__file__).resolve()), "--serve"] + [
+        arg for arg in sys.argv[1:] if arg != "--serve"
+    ]
+    server = subprocess.Popen(command)
+    base = f"http://127.0.0.1:{args.port}"
+    report = {"config": {k: v for k, v in vars(args).items() if k != "serve"}, "steps": []}
+    try:
+        _wait_ready(base, server, timeout=60)
+        for clients in [int(value) for value in args.clients.split(",") if value.strip()]:
+            result = run_step(base, clients, args.duration, server.pid)
+            report["steps"].append(result)
+            slowest = max(
+                (item["p95_ms"] or 0.0 for item in result["endpoints"].values()),
+                default=0.0,
+            )
+            print(
+                f"clients={clients:>3}  stream fps mean={result['stream']['fps_mean']} "
+                f"min={result['stream']['fps_min']}  worst p95={slowest}ms  "
+                f"server cpu={result['server_cpu_percent']}%"
+            )
+            time.sleep(1.0)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
+import argparse
 import json
 import os
 import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
 
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
-from supabase import create_client
 
 load_dotenv()
 
@@ -11,81 +16,239 @@ load_dotenv()
 SQLITE_PATH = os.getenv("SQLITE_PATH", "faces.db")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+CHECKPOINT_PATH = os.getenv("MIGRATE_CHECKPOINT_PATH", "migrate_checkpoint.json")
+MIGRATE_WORKERS = int(os.getenv("MIGRATE_WORKERS", "4"))
+
+# PostgREST answers these when it is overloaded or restarting; other errors will not go away on a retry.
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
 
 
 def _to_bytea_hex(blob: bytes) -> str:
     return "\\x" + blob.hex()
 
 
-def _load_faces(conn: sqlite3.Connection) -> list[dict]:
-    cur = conn.execute("SELECT id, name, embedding, dim, created_at FROM faces ORDER BY id")
-    rows = cur.fetchall()
-    results = []
-    for row in rows:
-        results.append(
-            {
-                "id": row[0],
-                "name": row[1],
-                "embedding": _to_bytea_hex(row[2]),
-                "dim": row[3],
-                "created_at": row[4],
-            }
+def _parse_bbox(raw):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+
+# table -> (select columns, row converter, batch size)
+TABLES = {
+    "faces": (
+        "id, name, embedding, dim, created_at",
+        lambda row: {
+            "id": row[0],
+            "name": row[1],
+            "embedding": _to_bytea_hex(row[2]),
+            "dim": row[3],
+            "created_at": row[4],
+        },
+        200,
+    ),
+    "face_samples": (
+        "id, face_id, embedding, dim, created_at",
+        lambda row: {
+            "id": row[0],
+            "face_id": row[1],
+            "embedding": _to_bytea_hex(row[2]),
+            "dim": row[3],
+            "created_at": row[4],
+        },
+        200,
+    ),
+    "unknown_faces": (
+        "id, embedding, dim, first_seen, last_seen, sightings",
+        lambda row: {
+            "id": row[0],
+            "embedding": _to_bytea_hex(row[1]),
+            "dim": row[2],
+            "first_seen": row[3],
+            "last_seen": row[4],
+            "sightings": row[5],
+        },
+        200,
+    ),
+    "events": (
+        "id, event_type, face_type, face_id, name, score, bbox, created_at",
+        lambda row: {
+            "id": row[0],
+            "event_type": row[1],
+            "face_type": row[2],
+            "face_id": row[3],
+            "name": row[4],
+            "score": row[5],
+            "bbox": _parse_bbox(row[6]),
+            "created_at": row[7],
+        },
+        500,
+    ),
+}
+
+
+def _iter_batches(conn: sqlite3.Connection, table: str, after_id: int):
+    columns, convert, size = TABLES[table]
+    last_id = after_id
+    while True:
+        # Keyset pagination keeps only one batch of rows in memory at a time.
+        cur = conn.execute(
+            f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, size),
         )
-    return results
-
-
-def _load_events(conn: sqlite3.Connection) -> list[dict]:
-    cur = conn.execute(
-        "SELECT id, event_type, face_type, face_id, name, score, bbox, created_at FROM events ORDER BY id"
-    )
-    rows = cur.fetchall()
-    results = []
-    for row in rows:
-        bbox = None
-        if row[6]:
-            try:
-                bbox = json.loads(row[6])
-            except json.JSONDecodeError:
-                bbox = None
-        results.append(
+        rows = cur.fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield last_id, [convert(row) for row in rows]
+
+
+def _load_checkpoint(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_checkpoint(path: str, checkpoint: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+class RestUpserter:
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        workers: int,
+        retries: int = 5,
+        backoff_s: float = 1.0,
+        backoff_max_s: float = 60.0,
+    ) -> None:
+        self.base = url.rstrip("/") + "/rest/v1"
+        self.retries = max(1, retries)
+        self.backoff_s = max(0.0, float(backoff_s))
+        self.backoff_max_s = max(self.backoff_s, float(backoff_max_s))
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update(
             {
-                "id": row[0],
-                "event_type": row[1],
-                "face_type": row[2],
-                "face_id": row[3],
-                "name": row[4],
-                "score": row[5],
-                "bbox": bbox,
-                "created_at": row[7],
+                "apikey": key,
+                "Authorization": f"Bearer {key}",
+                "Content-Type": "application/json",
+                "Prefer": "resolution=merge-duplicates,return=minimal",
             }
         )
-    return results
-
 
-def _chunk(items, size: int):
-    for i in range(0, len(items), size):
-        yield items[i : i + size]
+    def _retry_after(self, resp) -> float | None:
+        value = (resp.headers.get("Retry-After") or "").strip()
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def upsert(self, table: str, rows: list[dict]) -> None:
+        last_error = None
+        for attempt in range(self.retries):
+            # Exponential backoff, unless the server said how long to wait.
+            delay = min(self.backoff_max_s, self.backoff_s * 2**attempt)
+            try:
+                resp = self._session.post(f"{self.base}/{table}", data=json.dumps(rows), timeout=60)
+            except requests.RequestException as exc:
+                last_error = str(exc)
+            else:
+                if resp.status_code < 400:
+                    return
+                last_error = f"{resp.status_code}: {resp.text[:200]}"
+                if resp.status_code not in RETRY_STATUSES:
+                    break
+                retry_after = self._retry_after(resp)
+                if retry_after is not None:
+                    delay = min(self.backoff_max_s, retry_after)
+            if attempt + 1 < self.retries:
+                time.sleep(delay)
+        raise RuntimeError(f"upsert into {table} failed: {last_error}")
+
+
+def migrate_table(conn, upserter, table: str, checkpoint: dict, checkpoint_path: str, workers: int) -> int:
+    done_id = int(checkpoint.get(table, 0))
+    migrated = 0
+    pending = {}
+    # Batches finish out of order; the checkpoint only advances past contiguous completed ids.
+    order: list[int] = []
+    completed: set[int] = set()
+
+    def _settle(futures) -> None:
+        nonlocal done_id
+        error = None
+        for future in futures:
+            last_id = pending.pop(future)
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            completed.add(last_id)
+        while order and order[0] in completed:
+            done_id = order.pop(0)
+            completed.discard(done_id)
+        checkpoint[table] = done_id
+        _save_checkpoint(checkpoint_path, checkpoint)
+        if error is not None:
+            raise error
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for last_id, rows in _iter_batches(conn, table, done_id):
+            if len(pending) >= workers:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                _settle(finished)
+            order.append(last_id)
+            pending[pool.submit(upserter.upsert, table, rows)] = last_id
+            migrated += len(rows)
+        _settle(wait(pending).done)
+    return migrated
 
 
 def main() -> None:
-    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+    parser = argparse.ArgumentParser(description="Stream the local SQLite database into Supabase.")
+    parser.add_argument("--sqlite", default=SQLITE_PATH)
+    parser.add_argument("--url", default=SUPABASE_URL)
+    parser.add_argument("--key", default=SUPABASE_SERVICE_KEY)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS)
+    parser.add_argument("--tables", default=",".join(TABLES))
+    parser.add_argument("--reset", action="store_true", help="ignore and overwrite an existing checkpoint")
+    args = parser.parse_args()
+
+    if not args.url or not args.key:
         raise SystemExit("Missing SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
 
-    conn = sqlite3.connect(SQLITE_PATH)
-    faces = _load_faces(conn)
-    events = _load_events(conn)
-    conn.close()
-
-    client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-
-    for batch in _chunk(faces, 200):
-        client.table("faces").upsert(batch).execute()
-
-    for batch in _chunk(events, 500):
-        client.table("events").upsert(batch).execute()
-
-    print(f"Migrated faces: {len(faces)}")
-    print(f"Migrated events: {len(events)}")
+    tables = [table.strip() for table in args.tables.split(",") if table.strip()]
+    unknown = [table for table in tables if table not in TABLES]
+    if unknown:
+        raise SystemExit(f"Unknown tables: {', '.join(unknown)}")
+
+    workers = max(1, args.workers)
+    checkpoint = {} if args.reset else _load_checkpoint(args.checkpoint)
+    conn = sqlite3.connect(args.sqlite)
+    upserter = RestUpserter(args.url, args.key, workers=workers)
+    try:
+        for table in tables:
+            count = migrate_table(conn, upserter, table, checkpoint, args.checkpoint, workers)
+            print(f"Migrated {table}: {count} (through id {checkpoint.get(table, 0)})")
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
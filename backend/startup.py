@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger("vision-v1")
+
+
+class _Component:
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[], Any],
+        on_ready: Callable[[], Any] | None,
+        after: tuple[str, ...],
+        degraded: Callable[[], str | None] | None,
+    ) -> None:
+        self.name = name
+        self.load = load
+        self.on_ready = on_ready
+        self.after = after
+        self.degraded = degraded
+        self.state = "pending"
+        self.error: str | None = None
+        self.load_s: float | None = None
+        self.ready_at_s: float | None = None
+        self.done = threading.Event()
+
+
+class StartupLoader:
+    def __init__(self) -> None:
+        self._components: dict[str, _Component] = {}
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._started_at: float | None = None
+        self._stop = threading.Event()
+
+    def add(
+        self,
+        name: str,
+        load: Callable[[], Any],
+        on_ready: Callable[[], Any] | None = None,
+        after: tuple[str, ...] = (),
+        degraded: Callable[[], str | None] | None = None,
+    ) -> None:
+        # `degraded` returns a reason while a running component lacks part of its function, or None once it recovers.
+        self._components[name] = _Component(name, load, on_ready, tuple(after), degraded)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._started_at = time.perf_counter()
+        # Every component loads on its own thread; `after` only orders the ones that share a dependency.
+        for component in self._components.values():
+            thread = threading.Thread(target=self._run, args=(component,), name=f"load-{component.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for component in self._components.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not component.done.wait(remaining):
+                return False
+        return True
+
+    def is_ready(self, name: str) -> bool:
+        component = self._components.get(name)
+        return component is not None and component.state == "ready"
+
+    def _set_state(self, component: _Component, state: str) -> None:
+        with self._lock:
+            component.state = state
+
+    def _run(self, component: _Component) -> None:
+        try:
+            for name in component.after:
+                dependency = self._components.get(name)
+                if dependency is not None:
+                    dependency.done.wait()
+            if self._stop.is_set():
+                return
+            self._set_state(component, "loading")
+            started = time.perf_counter()
+            try:
+                component.load()
+                if component.on_ready is not None and not self._stop.is_set():
+                    component.on_ready()
+            except Exception as exc:
+                with self._lock:
+                    component.state = "failed"
+                    component.error = str(exc)
+                    component.load_s = round(time.perf_counter() - started, 3)
+                logger.error("Startup: %s failed after %.2fs: %s", component.name, component.load_s, exc)
+                return
+            finished = time.perf_counter()
+            with self._lock:
+                component.state = "ready"
+                component.load_s = round(finished - started, 3)
+                component.ready_at_s = round(finished - (self._started_at or started), 3)
+            logger.info(
+                "Startup: %s ready in %.2fs (%.2fs after start)",
+                component.name,
+                component.load_s,
+                component.ready_at_s,
+            )
+        finally:
+            component.done.set()
+
+    def _degraded_reason(self, component: _Component) -> str | None:
+        if component.degraded is None or component.state != "ready":
+            return None
+        try:
+            return component.degraded()
+        except Exception as exc:
+            return str(exc)
+
+    def get_status(self) -> dict[str, Any]:
+        reasons = {component.name: self._degraded_reason(component) for component in self._components.values()}
+        with self._lock:
+            components = {
+                component.name: {
+                    "state": "degraded" if reasons[component.name] else component.state,
+                    "load_s": component.load_s,
+                    "ready_at_s": component.ready_at_s,
+                    "error": reasons[component.name] or component.error,
+                }
+                for component in self._components.values()
+            }
+        # A degraded component is running, so it does not hold back readiness.
+        ready = all(item["state"] in ("ready", "degraded") for item in components.values())
+        # Once everything has settled this is the total startup time; before that it keeps counting.
+        elapsed = None
+        if self._started_at is not None:
+            if all(component.done.is_set() for component in self._components.values()):
+                elapsed = max((item["ready_at_s"] or item["load_s"] or 0.0 for item in components.values()), default=0.0)
+            else:
+                elapsed = round(time.perf_counter() - self._started_at, 3)
+        return {"ready": ready, "elapsed_s": elapsed, "components": components}
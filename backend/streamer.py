@@ -5,6 +5,8 @@ from typing import Generator
 
 import cv2
 
+from metrics import stage
+
 
 def _draw_face_label(frame, result) -> None:
     if not result or not result.get("ok"):
@@ -33,13 +35,17 @@ def _draw_face_label(frame, result) -> None:
 def mjpeg_generator(detector, fps: int, face_recognition_service=None) -> Generator[bytes, None, None]:
     delay = 1.0 / max(1, fps)
     while True:
-        frame = detector.get_latest_frame(annotated=True)
+        frame = detector.get_latest_frame(annotated=True, copy=False)
         if frame is None:
             time.sleep(0.05)
             continue
-        if face_recognition_service is not None:
-            _draw_face_label(frame, face_recognition_service.get_last())
-        ok, encoded = cv2.imencode(".jpg", frame)
+        result = face_recognition_service.get_last() if face_recognition_service is not None else None
+        if result and result.get("ok") and result.get("faces"):
+            # Only streams that draw labels pay for a private copy of the shared frame.
+            frame = frame.copy()
+            _draw_face_label(frame, result)
+        with stage("stream_encode"):
+            ok, encoded = cv2.imencode(".jpg", frame)
         if not ok:
             time.sleep(delay)
             continue
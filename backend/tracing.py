@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+import numpy as np
+
+from metrics import REGISTRY
+
+# Recent latencies kept per result kind for the percentile stats.
+_WINDOW = 512
+
+FRAME_LATENCY_SECONDS = REGISTRY.histogram(
+    "vision_frame_latency_seconds",
+    "Time from camera capture to a published result, per result kind.",
+    ("result",),
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+_lock = threading.Lock()
+_recent: dict[str, deque[float]] = {}
+_counts: dict[str, int] = {}
+
+
+def new_trace(frame_id: int, captured_at: str, read_at: float) -> dict[str, Any]:
+    # read_at is monotonic so latencies survive wall-clock adjustments; captured_at is for people and the database.
+    return {"frame_id": frame_id, "captured_at": captured_at, "read_at": read_at}
+
+
+def result_trace(trace: dict[str, Any] | None, result: str) -> dict[str, Any] | None:
+    if trace is None:
+        return None
+    latency = max(0.0, time.monotonic() - trace["read_at"])
+    FRAME_LATENCY_SECONDS.observe(latency, result)
+    with _lock:
+        _recent.setdefault(result, deque(maxlen=_WINDOW)).append(latency)
+        _counts[result] = _counts.get(result, 0) + 1
+    return {
+        "frame_id": trace["frame_id"],
+        "captured_at": trace["captured_at"],
+        "latency_ms": round(latency * 1000, 1),
+    }
+
+
+def get_latency_stats() -> dict[str, Any]:
+    with _lock:
+        recent = {result: np.array(values) for result, values in _recent.items()}
+        counts = dict(_counts)
+    stats = {}
+    for result, values in recent.items():
+        if not values.size:
+            continue
+        p50, p95, p99 = np.percentile(values, (50, 95, 99)) * 1000
+        stats[result] = {
+            "count": counts.get(result, 0),
+            "last_ms": round(float(values[-1]) * 1000, 1),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(values.max()) * 1000, 1),
+        }
+    return stats
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+logger = logging.getLogger("vision-v1")
+
+
+class UploadQueue:
+    def __init__(
+        self,
+        uploader,
+        path: str,
+        workers: int,
+        max_attempts: int,
+        backoff_max_s: float,
+    ) -> None:
+        self.uploader = uploader
+        self.workers = max(1, int(workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_max_s = max(1.0, float(backoff_max_s))
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._listeners: list[Callable[[int, str, str | None], None]] = []
+        self._init_db()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.uploader.enabled)
+
+    def _init_db(self) -> None:
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS upload_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    local_path TEXT NOT NULL,
+                    storage_path TEXT NOT NULL,
+                    content_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    url TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_upload_jobs_status ON upload_jobs (status, next_attempt_at)"
+            )
+            # Jobs that were in flight when the process died are retried.
+            self._conn.execute("UPDATE upload_jobs SET status = 'pending' WHERE status = 'uploading'")
+
+    def start(self) -> None:
+        if self._threads or not self.enabled:
+            return
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._loop, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+    def add_listener(self, listener: Callable[[int, str, str | None], None]) -> None:
+        self._listeners.append(listener)
+
+    def enqueue(self, local_path: str, storage_path: str, content_type: str = "image/jpeg") -> int:
+        now = datetime.utcnow().isoformat()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                """
+                INSERT INTO upload_jobs (local_path, storage_path, content_type, status, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, 'pending', ?, ?, ?)
+                """,
+                (local_path, storage_path, content_type, time.time(), now, now),
+            )
+            job_id = int(cur.lastrowid)
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id: int) -> dict[str, Any] | None:
+        with self._lock:
+            cur = self._conn.execute(
+                """
+                SELECT id, local_path, storage_path, status, attempts, url, error, created_at, updated_at
+                FROM upload_jobs
+                WHERE id = ?
+                """,
+                (job_id,),
+            )
+            row = cur.fetchone()
+        return dict(row) if row else None
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            cur = self._conn.execute("SELECT status, COUNT(*) AS total FROM upload_jobs GROUP BY status")
+            rows = cur.fetchall()
+        return {str(row["status"]): int(row["total"]) for row in rows}
+
+    def _claim(self) -> dict[str, Any] | None:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                """
+                SELECT id, local_path, storage_path, content_type, attempts
+                FROM upload_jobs
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at
+                LIMIT 1
+                """,
+                (time.time(),),
+            )
+            row = cur.fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE upload_jobs SET status = 'uploading', updated_at = ? WHERE id = ?",
+                (datetime.utcnow().isoformat(), row["id"]),
+            )
+        return dict(row)
+
+    def _next_due_in(self) -> float:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT MIN(next_attempt_at) AS due FROM upload_jobs WHERE status = 'pending'"
+            )
+            row = cur.fetchone()
+        if row is None or row["due"] is None:
+            return self.backoff_max_s
+        return min(self.backoff_max_s, max(0.05, float(row["due"]) - time.time()))
+
+    def _finish(self, job_id: int, status: str, attempts: int, url: str | None, error: str | None, delay: float = 0.0) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE upload_jobs
+                SET status = ?, attempts = ?, url = ?, error = ?, next_attempt_at = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (status, attempts, url, error, time.time() + delay, datetime.utcnow().isoformat(), job_id),
+            )
+        if status == "pending":
+            return
+        for listener in list(self._listeners):
+            try:
+                listener(job_id, status, url)
+            except Exception:
+                continue
+
+    def _process(self, job: dict[str, Any]) -> None:
+        attempts = int(job["attempts"]) + 1
+        try:
+            with open(job["local_path"], "rb") as f:
+                data = f.read()
+        except OSError as exc:
+            self._finish(job["id"], "failed", attempts, None, f"read_failed: {exc}")
+            return
+
+        upload = self.uploader.upload_once(
+            job["storage_path"], data, content_type=job["content_type"], retry=attempts > 1
+        )
+        if upload.get("ok"):
+            self._finish(job["id"], "done", attempts, upload.get("url"), None)
+            try:
+                os.remove(job["local_path"])
+            except OSError:
+                pass
+            return
+
+        error = upload.get("error") or "upload failed"
+        if attempts >= self.max_attempts:
+            logger.warning("Upload %s failed after %s attempts: %s", job["id"], attempts, error)
+            self._finish(job["id"], "failed", attempts, None, error)
+            return
+        delay = min(self.backoff_max_s, float(2 ** (attempts - 1)))
+        self._finish(job["id"], "pending", attempts, None, error, delay=delay)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            # Cleared before claiming, so an enqueue that lands between the claim and the wait is not missed.
+            self._wakeup.clear()
+            job = self._claim()
+            if job is None:
+                self._wakeup.wait(self._next_due_in())
+                continue
+            try:
+                self._process(job)
+            except Exception as exc:
+                self._finish(job["id"], "pending", int(job["attempts"]) + 1, None, str(exc), delay=self.backoff_max_s)
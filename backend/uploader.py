@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import time
 from typing import Any
 
 from supabase import create_client
@@ -12,23 +11,41 @@ class SupabaseUploader:
     def __init__(self, url: str | None, key: str | None, bucket: str = "captures") -> None:
         self.enabled = bool(url and key)
         self.bucket = bucket
-        self._client = create_client(url, key) if self.enabled else None
-
-    def upload_image(self, storage_path: str, data: bytes, content_type: str = "image/jpeg") -> dict[str, Any]:
+        self._url = url
+        self._key = key
+        self._client = None
+        self._bucket = None
+
+    def load(self) -> None:
+        if self.enabled and self._client is None:
+            self._client = create_client(self._url, self._key)
+
+    def upload_once(
+        self, storage_path: str, data: bytes, content_type: str = "image/jpeg", retry: bool = False
+    ) -> dict[str, Any]:
         if not self.enabled:
             return {"ok": False, "error": "Supabase not configured"}
-
-        bucket = self._client.storage.from_(self.bucket)
-        last_error = None
-        for attempt in range(4):
-            try:
-                bucket.upload(storage_path, data, {"content-type": content_type, "upsert": False})
-                public_url = bucket.get_public_url(storage_path)
-                return {"ok": True, "url": public_url}
-            except Exception as exc:  # pragma: no cover - transient SDK errors
-                last_error = str(exc)
-                time.sleep(2**attempt)
-        return {"ok": False, "error": last_error or "upload failed"}
+        try:
+            if self._bucket is None:
+                self.load()
+                self._bucket = self._client.storage.from_(self.bucket)
+            self._bucket.upload(storage_path, data, {"content-type": content_type, "upsert": False})
+            public_url = self._bucket.get_public_url(storage_path)
+            return {"ok": True, "url": public_url}
+        except Exception as exc:  # pragma: no cover - transient SDK errors
+            # An earlier attempt that timed out may still have landed; storage paths are unique per capture,
+            # so on a retry "already exists" means the object is ours.
+            if retry and _is_duplicate(exc):
+                return {"ok": True, "url": self._bucket.get_public_url(storage_path)}
+            return {"ok": False, "error": str(exc)}
+
+
+def _is_duplicate(exc: Exception) -> bool:
+    details = exc.args[0] if exc.args and isinstance(exc.args[0], dict) else {}
+    if str(details.get("statusCode") or getattr(exc, "status", "")) == "409":
+        return True
+    text = str(exc)
+    return "Duplicate" in text or "already exists" in text
 
 
 def build_storage_path(filename: str) -> str:
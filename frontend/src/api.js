@@ -19,6 +19,13 @@ export async function captureImage() {
   return data;
 }
 
+export async function captureStatus(jobId) {
+  const res = await fetch(`${BASE}/capture/${jobId}`);
+  const data = await res.json();
+  if (!res.ok) throw new Error(data?.detail || "capture_status_failed");
+  return data;
+}
+
 export function streamUrl() {
   return `${BASE}/video-stream`;
 }
@@ -1,5 +1,5 @@
 import { useState } from "react";
-import { captureImage } from "../api.js";
+import { captureImage, captureStatus } from "../api.js";
 
 export default function Controls() {
   const [status, setStatus] = useState("idle");
@@ -9,8 +9,21 @@ export default function Controls() {
     setStatus("capturing");
     try {
       const res = await captureImage();
-      setLastUrl(res.upload_url || null);
-      setStatus(res.ok ? "uploaded" : "failed");
+      setStatus("uploading");
+      for (let i = 0; i < 30; i += 1) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const { job } = await captureStatus(res.job_id);
+        if (job.status === "done") {
+          setLastUrl(job.url || null);
+          setStatus("uploaded");
+          return;
+        }
+        if (job.status === "failed") {
+          setStatus("failed");
+          return;
+        }
+      }
+      setStatus("queued");
     } catch (err) {
       setStatus(err.message || "failed");
     }